@@ -0,0 +1,159 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Batch position analysis: reads positions from a file or stdin, searches each one with AIPlayer
+in a process pool, and streams the results out as JSON lines.
+
+NOTES:
+    * Each input line is [id] board color: an optional id without spaces, the 64 squares row by row
+      as Board.toString() writes them (B, W and - or .), and the side to move (B or W)
+    * Blank lines and lines starting with # are skipped; lines without an id are tagged by line number
+    * Each result line holds id, line, color, move ([row, column], or null when the side must pass
+      or the game is over), score (for Black, as everywhere in the engine), scoreType, depth, nodes,
+      seconds and how the move was chosen; a line that can't be read gets an error instead
+    * scoreType says what score measures: "evaluation" units of the heuristic, or for positions solved
+      by the endgame solver "discs", the final disc difference, or "wld", 1/0/-1 for a win/draw/loss
+    * Scores of won or lost positions are written as the strings "inf" and "-inf", since JSON has no infinity
+    * Results come out in input order, or as they finish with --unordered (use the ids to match them up)
+    * At most --window positions are read ahead of the results written, so memory stays bounded
+      however long the input is
+    * Each pool worker keeps one AIPlayer, and its transposition table, for all the positions it is sent
+
+Usage:
+    python Analyze.py positions.txt --depth 4 --workers 4 > analysis.jsonl
+    python Analyze.py --seconds 0.5 --unordered < positions.txt
+'''
+
+
+import sys, os, math, json, argparse, itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from OthelloEngine import Board, AIPlayer
+
+
+# The AI of each pool worker process
+WORKER_AI = None
+
+
+def initAnalysisWorker(arguments):
+    '''Creates the AI a pool worker analyzes every position with'''
+    global WORKER_AI
+    WORKER_AI = AIPlayer(Board(), stats=True, **arguments)
+
+
+def parsePosition(text, number):
+    '''Returns (id, board squares, color) for one input line, tagged by its line number when it has no id.
+    Raises ValueError if the line is not a position'''
+    tokens = text.split()
+    if len(tokens) < 2:
+        raise ValueError("Expected [id] board color")
+    if len(tokens) >= 3 and len("".join(tokens[1:-1])) == 64:
+        return tokens[0], "".join(tokens[1:-1]), tokens[-1]
+    return str(number), "".join(tokens[:-1]), tokens[-1]
+
+
+def jsonScore(value):
+    '''Returns a search value as JSON can hold it'''
+    if value is None or math.isfinite(value):
+        return value
+    return "inf" if value > 0 else "-inf"
+
+
+def analyzePosition(task):
+    '''Worker task: searches one input line. Returns its result as a JSON-ready dictionary'''
+    number, text = task
+    result = {"id": str(number), "line": number}
+    try:
+        result["id"], squares, color = parsePosition(text, number)
+        board = Board.fromString(squares, color)
+    except ValueError as error:
+        result["error"] = str(error)
+        return result
+
+    result["color"] = color
+    if board.endState or board.mustPass:
+        # Nothing to search: the side to move passes, or neither side can move
+        result.update({"move": None, "score": None, "scoreType": None, "depth": 0, "nodes": 0, "seconds": 0,
+                       "mode": "over" if board.endState else "pass"})
+        return result
+
+    WORKER_AI.board = board
+    WORKER_AI.AIColor = color
+    WORKER_AI.chooseMove(board.copy())
+    stats = WORKER_AI.lastStats
+    result.update({"move": stats["move"], "score": jsonScore(stats["value"]), "scoreType": stats["valueType"],
+                   "depth": stats["depth"],
+                   "nodes": stats["nodes"], "seconds": stats["seconds"], "mode": stats["mode"]})
+    return result
+
+
+def readPositions(lines):
+    '''Yields (line number, text) for every input line holding a position'''
+    for number, line in enumerate(lines, 1):
+        text = line.strip()
+        if text and not text.startswith("#"):
+            yield number, text
+
+
+def analyze(lines, output, arguments, workers=None, window=None, ordered=True):
+    '''Analyzes the positions of lines with AIPlayer(**arguments) in workers processes, writing one
+    JSON line per position to output. Returns the number of positions analyzed'''
+    tasks = readPositions(lines)
+    written = 0
+    if window is None:
+        window = 4 * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(workers, initializer=initAnalysisWorker, initargs=(arguments,)) as pool:
+        pending = deque(pool.submit(analyzePosition, task) for task in itertools.islice(tasks, window))
+
+        while pending:
+            if ordered:
+                finished = [pending.popleft()]
+            else:
+                done, waiting = wait(pending, return_when=FIRST_COMPLETED)
+                finished = list(done)
+                pending = deque(future for future in pending if future not in done)
+
+            for future in finished:
+                output.write(json.dumps(future.result()) + "\n")
+                written += 1
+            output.flush()
+
+            # Read ahead only as far as results have been written
+            pending.extend(pool.submit(analyzePosition, task) for task in itertools.islice(tasks, len(finished)))
+    return written
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Analyze Othello positions with AIPlayer, one JSON line per position")
+    parser.add_argument("input", nargs="?", help="file of positions, one [id] board color per line (default: stdin)")
+    parser.add_argument("--depth", type=int, default=4, help="search depth, unless a time or node limit is given")
+    parser.add_argument("--seconds", type=float, default=None, help="time limit per position (iterative deepening)")
+    parser.add_argument("--nodes", type=int, default=None, help="node limit per position (iterative deepening)")
+    parser.add_argument("--evaluation", choices=("patterns", "discs"), default="patterns", help="evaluation function")
+    parser.add_argument("--endgame-empties", type=int, default=10, help="empties from which positions are solved exactly")
+    parser.add_argument("--table-bytes", type=int, default=16 * 2 ** 20, help="transposition table size per worker")
+    parser.add_argument("--workers", type=int, default=None, help="analysis processes (default: one per CPU)")
+    parser.add_argument("--window", type=int, default=None, help="positions read ahead of the output (default: 4 per worker)")
+    parser.add_argument("--unordered", action="store_true", help="write results as they finish instead of in input order")
+    options = parser.parse_args(arguments)
+
+    aiArguments = {"lookAhead": options.depth, "timeBudget": options.seconds, "nodeBudget": options.nodes,
+                   "evaluation": options.evaluation, "endgameEmpties": options.endgame_empties,
+                   "tableBytes": options.table_bytes}
+    if options.input is None:
+        analyze(sys.stdin, sys.stdout, aiArguments, options.workers, options.window, not options.unordered)
+    else:
+        with open(options.input) as lines:
+            analyze(lines, sys.stdout, aiArguments, options.workers, options.window, not options.unordered)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
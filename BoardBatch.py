@@ -0,0 +1,229 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Many boards at once: the bitboards of N games held in NumPy arrays, so that move generation,
+playing moves and evaluation run as a handful of array operations for the whole batch.
+
+NOTES:
+    * Requires NumPy, which the rest of the engine does not need
+    * Boards are uint64 arrays using Board's bit layout, bit (row - 1) * 8 + (column - 1) for [row,column]
+    * colors holds the side to move of each board (0 for Black, 1 for White), and mustPass/endState
+      mean exactly what they do on a Board: the side to move must pass, or neither side can move
+    * Moves are bit indices, with -1 for a pass (or for a board whose game is over)
+    * Every step matches the scalar Board rules, including passes and endState; evaluate() matches
+      StateNode.heuristicEvaluation()/endStateEvaluation() value for value
+'''
+
+
+import numpy as np
+from OthelloEngine import Board
+
+
+# Board.shifts as (amount, shifts left, mask) in NumPy types
+SHIFTS = [(np.uint64(abs(amount)), amount > 0, np.uint64(mask)) for amount, mask in Board.shifts]
+
+ONE = np.uint64(1)
+ZERO = np.uint64(0)
+
+if hasattr(np, "bitwise_count"):
+    def popcount(bits):
+        '''Returns the number of set bits in each element of a uint64 array'''
+        return np.bitwise_count(bits).astype(np.int64)
+else:
+    BYTE_COUNTS = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+    def popcount(bits):
+        '''Returns the number of set bits in each element of a uint64 array'''
+        return BYTE_COUNTS[np.ascontiguousarray(bits).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def shift(bits, amount, left, mask):
+    '''Moves every chip one step along a direction, like Board.shift()'''
+    if left:
+        return (bits << amount) & mask
+    return (bits >> amount) & mask
+
+
+def generateMoves(own, opponent):
+    '''Returns the legal moves of the owner of own on each board, like Board.generateMoves()'''
+    empty = ~(own | opponent)
+    moves = np.zeros_like(own)
+    for amount, left, mask in SHIFTS:
+        line = shift(own, amount, left, mask) & opponent
+        line |= shift(line, amount, left, mask) & opponent
+        line |= shift(line, amount, left, mask) & opponent
+        line |= shift(line, amount, left, mask) & opponent
+        line |= shift(line, amount, left, mask) & opponent
+        line |= shift(line, amount, left, mask) & opponent
+        moves |= shift(line, amount, left, mask) & empty
+    return moves
+
+
+def computeFlips(own, opponent, moves):
+    '''Returns the chips captured by the owner of own placing a chip on the single bit in moves
+    (no bit meaning no move) on each board, like Board.computeFlips() for a legal move'''
+    flips = np.zeros_like(own)
+    for amount, left, mask in SHIFTS:
+        line = shift(moves, amount, left, mask) & opponent
+        line |= shift(line, amount, left, mask) & opponent
+        line |= shift(line, amount, left, mask) & opponent
+        line |= shift(line, amount, left, mask) & opponent
+        line |= shift(line, amount, left, mask) & opponent
+        line |= shift(line, amount, left, mask) & opponent
+
+        # The run of opposing chips is only captured when one of our own closes it
+        closed = (shift(line, amount, left, mask) & own) != ZERO
+        flips |= np.where(closed, line, ZERO)
+    return flips
+
+
+class BoardBatch:
+    '''N boards, each with its own side to move, stepped together'''
+
+    def __init__(self, count):
+        '''Creates count boards in the initial position, Black to move'''
+        start = Board()
+        self.black = np.full(count, start.black, dtype=np.uint64)
+        self.white = np.full(count, start.white, dtype=np.uint64)
+        self.colors = np.zeros(count, dtype=np.int8)
+        self.mustPass = np.zeros(count, dtype=bool)
+        self.endState = np.zeros(count, dtype=bool)
+
+    def __len__(self):
+        return len(self.black)
+
+    @staticmethod
+    def fromBoards(boards, colors):
+        '''Creates a batch from Board objects and the color ('B' or 'W') to move on each'''
+        batch = BoardBatch(0)
+        batch.black = np.array([board.black for board in boards], dtype=np.uint64)
+        batch.white = np.array([board.white for board in boards], dtype=np.uint64)
+        batch.colors = np.array([color == 'W' for color in colors], dtype=np.int8)
+        batch.mustPass = np.array([board.mustPass for board in boards], dtype=bool)
+        batch.endState = np.array([board.endState for board in boards], dtype=bool)
+        return batch
+
+    def board(self, number):
+        '''Returns (Board, color to move) for one board of the batch'''
+        board = Board()
+        board.black = int(self.black[number])
+        board.white = int(self.white[number])
+        board.score = [board.black.bit_count(), board.white.bit_count()]
+        board.forgetMoves()
+        board.mustPass = bool(self.mustPass[number])
+        board.endState = bool(self.endState[number])
+        board.hash = board.computeHash()
+        return board, 'W' if self.colors[number] else 'B'
+
+    def scores(self):
+        '''Returns the (black, white) chip counts of every board'''
+        return popcount(self.black), popcount(self.white)
+
+    def getBitboards(self):
+        '''Returns the (own, opponent) bitboards from the perspective of each board's side to move'''
+        white = self.colors == 1
+        return np.where(white, self.white, self.black), np.where(white, self.black, self.white)
+
+    def legalMoves(self):
+        '''Returns a bitboard of the legal moves of the side to move on each board
+        (empty where it must pass or the game is over)'''
+        own, opponent = self.getBitboards()
+        return generateMoves(own, opponent)
+
+    def play(self, moves):
+        '''Plays one move on every board: a bit index where the side to move has legal moves,
+        and -1 where it must pass or the game is over. Raises ValueError if any move is not legal'''
+        moves = np.asarray(moves, dtype=np.int64)
+        legal = self.legalMoves()
+        passing = moves < 0
+        bits = np.where(passing, ZERO, ONE << np.where(passing, 0, moves).astype(np.uint64))
+
+        # Only games in progress whose side to move has no move may pass
+        wrong = np.where(passing, legal != ZERO, (bits & legal) == ZERO)
+        if wrong.any():
+            number = int(np.argmax(wrong))
+            raise ValueError("Illegal move %d on board %d" % (moves[number], number))
+
+        # A pass only hands the turn over; the opponent is then certain to have a move
+        passed = passing & self.mustPass & ~self.endState
+        self.mustPass[passed] = False
+        self.colors[passed] ^= 1
+
+        played = ~passing
+        own, opponent = self.getBitboards()
+        flips = computeFlips(own, opponent, bits)
+        own = np.where(played, own | bits | flips, own)
+        opponent = np.where(played, opponent ^ flips, opponent)
+        white = self.colors == 1
+        self.black = np.where(white, opponent, own)
+        self.white = np.where(white, own, opponent)
+        self.colors[played] ^= 1
+
+        # Board.determinePassEnd() for the color that just played
+        nextOwn, nextOpponent = opponent, own
+        nextMoves = generateMoves(nextOwn, nextOpponent)
+        stuck = nextMoves == ZERO
+        self.mustPass = np.where(played, stuck, self.mustPass)
+        self.endState = np.where(played, stuck & (generateMoves(nextOpponent, nextOwn) == ZERO), self.endState)
+
+    def randomMoves(self, generator):
+        '''Returns a uniformly chosen legal move for each board, or -1 where there is none.
+        generator is a numpy.random.Generator'''
+        legal = self.legalMoves()
+        count = popcount(legal)
+        choice = np.floor(generator.random(len(self)) * count).astype(np.int64)
+        moves = np.full(len(self), -1, dtype=np.int64)
+        seen = np.zeros(len(self), dtype=np.int64)
+        for index in range(64):
+            present = ((legal >> np.uint64(index)) & ONE).astype(np.int64)
+            moves = np.where((present == 1) & (seen == choice), index, moves)
+            seen += present
+        return moves
+
+    def evaluate(self, weights=None):
+        '''Returns the value of every board for Black as StateNode's evaluation would, for the
+        color that just moved on it: endStateEvaluation() for finished games, and otherwise
+        the pattern evaluation of weights (a PatternWeights), or the chip count of Black without'''
+        blackCount, whiteCount = self.scores()
+        if weights is None:
+            values = blackCount.astype(np.float64)
+        else:
+            values = self.patternValues(weights).astype(np.float64)
+
+        finished = np.where(blackCount > whiteCount, np.inf, np.where(blackCount < whiteCount, -np.inf, 0.0))
+        return np.where(self.endState, finished, values)
+
+    def patternValues(self, weights):
+        '''Returns PatternState.evaluate() of every board, as integers'''
+        from PatternEvaluation import PATTERNS, QUADRANTS
+
+        # Each square's code (0 empty, 1 black, 2 white), read once for every pattern using it
+        codes = [(((self.black >> np.uint64(index)) & ONE) + 2 * ((self.white >> np.uint64(index)) & ONE)).astype(np.int64)
+                 for index in range(64)]
+        tables = [np.asarray(table, dtype=np.int64) for table in weights.tables]
+
+        values = np.zeros(len(self), dtype=np.int64)
+        for squares, table in PATTERNS:
+            configuration = np.zeros(len(self), dtype=np.int64)
+            for position, index in enumerate(squares):
+                configuration += codes[index] * 3 ** position
+            values += tables[table][configuration]
+
+        mobility = popcount(generateMoves(self.black, self.white)) - popcount(generateMoves(self.white, self.black))
+        values += weights.mobility * mobility
+
+        # The side actually to move, who has parity in regions with an odd number of empties
+        toMove = np.where(self.mustPass, self.colors ^ 1, self.colors)
+        empty = ~(self.black | self.white)
+        oddRegions = np.zeros(len(self), dtype=np.int64)
+        for quadrant in QUADRANTS:
+            oddRegions += popcount(empty & np.uint64(quadrant)) & 1
+        values += np.where(toMove == 0, 1, -1) * weights.parity * oddRegions
+        return values
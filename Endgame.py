@@ -0,0 +1,239 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Exact endgame solver: plays out every line from a position with few empty squares.
+
+NOTES:
+    * The search is a negamax over raw (own, opponent) bitboards, always from the side to move
+    * Scores are final disc differences, with empty squares left at the end going to the winner
+    * "exact" mode finds the exact disc difference, "wld" only whether the game is won, lost or drawn
+    * With many empties, moves leaving the opponent the fewest replies are searched first (fastest-first)
+    * With fewer, moves in quadrants holding an odd number of empties come first (parity)
+    * The last three empties are played by dedicated routines that skip move generation
+'''
+
+
+import time
+from OthelloEngine import Board
+
+
+def squarePreference(index):
+    '''Returns a sort key placing corners first, then edges, then the other squares'''
+    row, column = index // 8, index % 8
+    if (1 << index) & Board.CORNERS:
+        return (0, index)
+    elif row in (0, 7) or column in (0, 7):
+        return (1, index)
+    return (2, index)
+
+
+class EndgameSolver:
+    '''Solves positions exactly, counting the nodes and time each solve takes'''
+    # Above this many empties, fastest-first ordering is worth its cost
+    FASTEST_FIRST_EMPTIES = 7
+
+    # Bitboards of the four quadrants, used for parity ordering
+    QUADRANTS = [0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000]
+
+    # Static preference of each square for small endgames: corners first, then edges, then the rest
+    SQUARE_RANK = [squarePreference(index) for index in range(64)]
+
+    def __init__(self, mode="exact"):
+        '''mode is "exact" for the disc difference or "wld" for win/loss/draw only'''
+        if mode not in ("exact", "wld"):
+            raise ValueError("Unknown endgame mode: %r" % mode)
+        self.mode = mode
+        self.nodes = 0
+        self.seconds = 0
+
+    @staticmethod
+    def finalScore(own, opponent):
+        '''Returns the disc difference of a finished game, giving the empty squares to the winner'''
+        difference = own.bit_count() - opponent.bit_count()
+        empties = 64 - own.bit_count() - opponent.bit_count()
+        if difference > 0:
+            return difference + empties
+        elif difference < 0:
+            return difference - empties
+        return 0
+
+    def solve(self, board, color):
+        '''Solves board with color to move. Returns a dictionary with the best move (None to pass),
+        its score from color's perspective, and the nodes and seconds the solve took'''
+        start = time.perf_counter()
+        self.nodes = 0
+        own, opponent = board.getBitboards(color)
+
+        # Win/loss/draw only needs to know which side of zero the score falls
+        if self.mode == "wld":
+            alpha, beta = -1, 1
+        else:
+            alpha, beta = -64, 64
+
+        move = None
+        moves = Board.generateMoves(own, opponent)
+        if moves:
+            score = -65
+            for index in self.orderMoves(own, opponent, moves):
+                flips = Board.computeFlips(own, opponent, index)
+                value = -self.search(opponent ^ flips, own | (1 << index) | flips, -beta, -alpha)
+                if value > score:
+                    score = value
+                    move = Board.squarePosition(index)
+                    if value > alpha:
+                        alpha = value
+                        if alpha >= beta:
+                            break
+        else:
+            score = self.search(own, opponent, alpha, beta)
+
+        if self.mode == "wld":
+            score = (score > 0) - (score < 0)
+
+        self.seconds = time.perf_counter() - start
+        return {"move": move, "score": score, "mode": self.mode, "nodes": self.nodes, "seconds": self.seconds}
+
+    def orderMoves(self, own, opponent, moves):
+        '''Returns the bit indices of moves in the order they should be searched'''
+        empty = ~(own | opponent) & Board.FULL
+        indices = []
+        while moves:
+            move = moves & -moves
+            moves ^= move
+            indices += [move.bit_length() - 1]
+
+        # Fastest-first: the fewer replies a move allows, the quicker its subtree is refuted
+        if empty.bit_count() > EndgameSolver.FASTEST_FIRST_EMPTIES:
+            mobility = {}
+            for index in indices:
+                flips = Board.computeFlips(own, opponent, index)
+                mobility[index] = Board.generateMoves(opponent ^ flips, own | (1 << index) | flips).bit_count()
+            return sorted(indices, key=lambda index: (mobility[index], EndgameSolver.SQUARE_RANK[index]))
+
+        # Parity: playing last in a region is an advantage, so odd regions are entered first
+        odd = 0
+        for quadrant in EndgameSolver.QUADRANTS:
+            if (empty & quadrant).bit_count() & 1:
+                odd |= quadrant
+        return sorted(indices, key=lambda index: (not (1 << index) & odd, EndgameSolver.SQUARE_RANK[index]))
+
+    def search(self, own, opponent, alpha, beta, passed=False):
+        '''Returns the final disc difference for own, exact when it lies strictly between alpha and beta'''
+        self.nodes += 1
+        empty = ~(own | opponent) & Board.FULL
+        empties = empty.bit_count()
+
+        if empties <= 3:
+            squares = []
+            while empty:
+                square = empty & -empty
+                empty ^= square
+                squares += [square.bit_length() - 1]
+            if empties == 3:
+                return self.solveLast3(own, opponent, squares, alpha, beta)
+            elif empties == 2:
+                return self.solveLast2(own, opponent, squares[0], squares[1], alpha, beta)
+            elif empties == 1:
+                return self.solveLast1(own, opponent, squares[0])
+            return EndgameSolver.finalScore(own, opponent)
+
+        moves = Board.generateMoves(own, opponent)
+        if not moves:
+            if passed:
+                return EndgameSolver.finalScore(own, opponent)
+            return -self.search(opponent, own, -beta, -alpha, True)
+
+        score = -65
+        for index in self.orderMoves(own, opponent, moves):
+            flips = Board.computeFlips(own, opponent, index)
+            value = -self.search(opponent ^ flips, own | (1 << index) | flips, -beta, -alpha)
+            if value > score:
+                score = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+        return score
+
+    def solveLast1(self, own, opponent, square):
+        '''Returns the final disc difference for own with a single empty square left'''
+        self.nodes += 1
+        difference = own.bit_count() - opponent.bit_count()
+
+        # Whoever can play the last square takes it and everything it captures
+        flips = Board.computeFlips(own, opponent, square).bit_count()
+        if flips:
+            return difference + 1 + 2 * flips
+        flips = Board.computeFlips(opponent, own, square).bit_count()
+        if flips:
+            return difference - 1 - 2 * flips
+
+        # Nobody can play it, so it goes to the winner
+        if difference > 0:
+            return difference + 1
+        elif difference < 0:
+            return difference - 1
+        return 0
+
+    def solveLast2(self, own, opponent, first, second, alpha, beta, passed=False):
+        '''Returns the final disc difference for own with the two empty squares first and second left'''
+        self.nodes += 1
+        score = -65
+
+        flips = Board.computeFlips(own, opponent, first)
+        if flips:
+            score = -self.solveLast1(opponent ^ flips, own | (1 << first) | flips, second)
+            if score >= beta:
+                return score
+        flips = Board.computeFlips(own, opponent, second)
+        if flips:
+            score = max(score, -self.solveLast1(opponent ^ flips, own | (1 << second) | flips, first))
+        if score > -65:
+            return score
+
+        # Neither square can be played: pass, or end the game if the opponent can't play either
+        if passed:
+            return EndgameSolver.finalScore(own, opponent)
+        return -self.solveLast2(opponent, own, first, second, -beta, -alpha, True)
+
+    def solveLast3(self, own, opponent, squares, alpha, beta, passed=False):
+        '''Returns the final disc difference for own with the three empty squares listed in squares left'''
+        self.nodes += 1
+
+        # The square alone in its quadrant is the one worth playing first
+        first, second, third = squares
+        if EndgameSolver.quadrantOf(second) not in (EndgameSolver.quadrantOf(first), EndgameSolver.quadrantOf(third)):
+            first, second = second, first
+        elif EndgameSolver.quadrantOf(third) not in (EndgameSolver.quadrantOf(first), EndgameSolver.quadrantOf(second)):
+            first, third = third, first
+
+        score = -65
+        for square, others in ((first, (second, third)), (second, (first, third)), (third, (first, second))):
+            flips = Board.computeFlips(own, opponent, square)
+            if not flips:
+                continue
+            value = -self.solveLast2(opponent ^ flips, own | (1 << square) | flips, others[0], others[1], -beta, -alpha)
+            if value > score:
+                score = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        return score
+        if score > -65:
+            return score
+
+        if passed:
+            return EndgameSolver.finalScore(own, opponent)
+        return -self.solveLast3(opponent, own, squares, -beta, -alpha, True)
+
+    @staticmethod
+    def quadrantOf(index):
+        '''Returns which of the four quadrants bit index lies in'''
+        return (index // 32) * 2 + (index % 8) // 4
@@ -0,0 +1,330 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Game archive: finished games stored at about one byte per move, read back by replaying them
+through Board, with an optional index from positions to the games that reach them.
+
+NOTES:
+    * The archive is an 8 byte magic followed by games, each a byte holding its move count and then
+      one byte per move: the bit index of the square played, (row - 1) * 8 + (column - 1)
+    * Passes are not stored; replaying passes for the side to move whenever it has no legal move
+    * Every game starts from the initial position and is identified by its byte offset in the archive
+    * GameRecorder follows a live game through Board.addObserver(), so anything that plays through
+      modifyLayout() (GameService, Tournament, the pygame client) can be recorded as it goes
+    * A position's key is its Zobrist hash with the side to move, as in the transposition table
+    * The index file is a 24 byte header (magic, archive bytes covered, entry count) followed by
+      (key, game offset) entries sorted by key, each 16 bytes; lookups binary search it through mmap
+    * The index is built with sorted runs merged from temporary files, so memory stays bounded
+      however big the archive is; games appended after it was built are scanned on every query
+    * Keys can collide, so matches are confirmed by replaying the game unless verify is turned off
+
+Usage:
+    python GameArchive.py games.oga --build-index
+    python GameArchive.py games.oga --query "---------------------------BW------WB--------------------------- B"
+'''
+
+
+import os, sys, mmap, heapq, struct, tempfile, argparse
+from OthelloEngine import Board
+
+
+MAGIC = b"OTHGAME1"
+INDEX_MAGIC = b"OTHINDX1"
+INDEX_HEADER = struct.Struct("<8sQQ")
+INDEX_ENTRY = struct.Struct("<QQ")
+
+
+def moveIndex(move):
+    '''Returns the bit index of a move given as a bit index or [row, column]'''
+    if isinstance(move, int):
+        index = move
+    else:
+        index = Board.squareIndex(move[0], move[1])
+    if index is None or not 0 <= index < 64:
+        raise ValueError("Not a square: %r" % (move,))
+    return index
+
+
+def positionKey(board, color):
+    '''Returns the key of board with color to move'''
+    return board.hash ^ Board.sideKeys[color]
+
+
+def replay(moves):
+    '''Yields (board, color to move, bit index played next or None at the end) for every position
+    of a game given as bit indices, playing passes as they come up. The same Board is updated in
+    place between positions. Raises ValueError on an illegal move'''
+    board = Board()
+    color = 'B'
+    for index in moves:
+        if board.mustPass:
+            board.mustPass = False
+            color = Board.getOppositeColor(color)
+        yield board, color, index
+
+        flips = board.determineFlips(color, index)
+        if not flips:
+            raise ValueError("Illegal move %d for %s" % (index, color))
+        board.applyMove(color, index, flips)
+        color = Board.getOppositeColor(color)
+
+    if board.mustPass and not board.endState:
+        board.mustPass = False
+        color = Board.getOppositeColor(color)
+    yield board, color, None
+
+
+class GameArchiveWriter:
+    '''Appends games to an archive file, creating it if needed'''
+
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.games = 0
+
+    def writeGame(self, moves):
+        '''Appends one game, given as bit indices or [row, column] moves (None for passes is skipped),
+        and flushes it to the file so it survives the process. Returns its offset in the archive'''
+        indices = bytes(moveIndex(move) for move in moves if move is not None)
+        if len(indices) > 60:
+            raise ValueError("A game has at most 60 moves, not %d" % len(indices))
+        offset = self.file.tell()
+        self.file.write(bytes([len(indices)]) + indices)
+        self.file.flush()
+        self.games += 1
+        return offset
+
+    def record(self, board):
+        '''Returns a GameRecorder following the game played on board'''
+        return GameRecorder(self, board)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class GameRecorder:
+    '''Collects the moves of one game as modifyLayout() plays them on a board, for a GameArchiveWriter'''
+
+    def __init__(self, writer, board):
+        self.writer = writer
+        self.moves = bytearray()
+        self.offset = None
+        board.addObserver(self.observe)
+
+    def observe(self, color, row, column, captures):
+        self.moves.append(Board.squareIndex(row, column))
+
+    def takeBack(self, count):
+        '''Forgets the last count moves, for moves taken back with Board.undoMove()'''
+        del self.moves[len(self.moves) - count:]
+
+    def finish(self):
+        '''Writes the game once, however many times it is called. Returns its offset, or None for a game without moves'''
+        if self.offset is None and self.moves:
+            self.offset = self.writer.writeGame(self.moves)
+        return self.offset
+
+
+class GameArchive:
+    '''Read-only view of an archive file, mapped into memory'''
+
+    def __init__(self, path, indexPath=None):
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if self.map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("%s is not a game archive" % path)
+        self.index = None
+        if indexPath is not None and os.path.exists(indexPath):
+            self.index = PositionIndex(indexPath)
+
+    def games(self, start=len(MAGIC)):
+        '''Yields (offset, moves as bytes) for every game from offset start to the end of the archive'''
+        offset = start
+        end = len(self.map)
+        while offset < end:
+            count = self.map[offset]
+            if offset + 1 + count > end:
+                raise ValueError("Game at %d runs past the end of the archive" % offset)
+            yield offset, self.map[offset + 1:offset + 1 + count]
+            offset += 1 + count
+
+    def game(self, offset):
+        '''Returns the moves (as bytes) of the game at offset'''
+        count = self.map[offset]
+        return self.map[offset + 1:offset + 1 + count]
+
+    def reaches(self, offset, board, color):
+        '''Returns True if the game at offset passes through board with color to move'''
+        for position, toMove, index in replay(self.game(offset)):
+            if position.black == board.black and position.white == board.white and toMove == color:
+                return True
+            if position.score[0] + position.score[1] > board.score[0] + board.score[1]:
+                return False
+        return False
+
+    def gamesReaching(self, board, color, verify=True):
+        '''Returns the offsets of every game that passes through board with color to move,
+        looked up in the index where it covers the archive and scanned beyond it'''
+        key = positionKey(board, color)
+        offsets = []
+        start = len(MAGIC)
+        if self.index is not None and self.index.covered <= len(self.map):
+            offsets = self.index.lookup(key)
+            start = self.index.covered
+
+        # Games the index doesn't cover yet are replayed one by one
+        for offset, moves in self.games(start):
+            for position, toMove, index in replay(moves):
+                if positionKey(position, toMove) == key:
+                    offsets += [offset]
+                    break
+
+        if verify:
+            offsets = [offset for offset in offsets if self.reaches(offset, board, color)]
+        return offsets
+
+    def close(self):
+        if self.index is not None:
+            self.index.close()
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+
+class PositionIndex:
+    '''Read-only view of an index file, searched in place through mmap'''
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.covered, self.entries = INDEX_HEADER.unpack_from(self.map, 0)
+        if magic != INDEX_MAGIC or INDEX_HEADER.size + self.entries * INDEX_ENTRY.size > len(self.map):
+            self.close()
+            raise ValueError("%s is not a position index" % path)
+
+    def lookup(self, key):
+        '''Returns the game offsets stored for key'''
+        # Binary search for the first entry with this key, then read the run of them
+        low = 0
+        high = self.entries
+        while low < high:
+            middle = (low + high) // 2
+            if INDEX_ENTRY.unpack_from(self.map, INDEX_HEADER.size + middle * INDEX_ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        offsets = []
+        while low < self.entries:
+            entryKey, offset = INDEX_ENTRY.unpack_from(self.map, INDEX_HEADER.size + low * INDEX_ENTRY.size)
+            if entryKey != key:
+                break
+            offsets += [offset]
+            low += 1
+        return offsets
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def writeRun(entries, directory):
+    '''Sorts entries and writes them to a temporary file in directory. Returns its path'''
+    entries.sort()
+    descriptor, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(descriptor, "wb") as run:
+        for entry in entries:
+            run.write(INDEX_ENTRY.pack(*entry))
+    return path
+
+
+def readRun(path):
+    '''Yields the (key, offset) entries of a run file'''
+    with open(path, "rb") as run:
+        while True:
+            data = run.read(INDEX_ENTRY.size * 4096)
+            if not data:
+                break
+            yield from INDEX_ENTRY.iter_unpack(data)
+
+
+def buildIndex(archivePath, indexPath, runEntries=2 ** 20):
+    '''Writes the position index of an archive, holding at most runEntries entries in memory at once.
+    Returns the entry count'''
+    archive = GameArchive(archivePath)
+    directory = os.path.dirname(os.path.abspath(indexPath))
+    runs = []
+    entries = []
+    try:
+        for offset, moves in archive.games():
+            for board, color, index in replay(moves):
+                entries += [(positionKey(board, color), offset)]
+            if len(entries) >= runEntries:
+                runs += [writeRun(entries, directory)]
+                entries = []
+        covered = len(archive.map)
+        entries.sort()
+
+        count = 0
+        with open(indexPath, "wb") as output:
+            output.write(INDEX_HEADER.pack(INDEX_MAGIC, covered, 0))
+            for entry in heapq.merge(entries, *[readRun(run) for run in runs]):
+                output.write(INDEX_ENTRY.pack(*entry))
+                count += 1
+            output.seek(0)
+            output.write(INDEX_HEADER.pack(INDEX_MAGIC, covered, count))
+    finally:
+        archive.close()
+        for run in runs:
+            os.remove(run)
+    return count
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Index and query an archive of Othello games")
+    parser.add_argument("archive", help="game archive file")
+    parser.add_argument("--index", help="position index file (default: the archive path with .idx appended)")
+    parser.add_argument("--build-index", action="store_true", help="(re)build the position index")
+    parser.add_argument("--query", help="list the games reaching a position, given as 'board color'")
+    options = parser.parse_args(arguments)
+    indexPath = options.index or options.archive + ".idx"
+
+    if options.build_index:
+        count = buildIndex(options.archive, indexPath)
+        print("Indexed %d positions in %s" % (count, indexPath))
+
+    archive = GameArchive(options.archive, indexPath)
+    try:
+        if options.query is not None:
+            squares, separator, color = options.query.strip().rpartition(" ")
+            offsets = archive.gamesReaching(Board.fromString(squares, color.strip()), color.strip())
+            print("%d games reach the position" % len(offsets))
+            for offset in offsets:
+                print(offset, " ".join(str(index) for index in archive.game(offset)))
+        elif not options.build_index:
+            games = moves = 0
+            for offset, gameMoves in archive.games():
+                games += 1
+                moves += len(gameMoves)
+            print("%d games, %d moves, %d bytes (%.2f bytes per move)"
+                  % (games, moves, len(archive.map), len(archive.map) / max(1, moves)))
+    finally:
+        archive.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Game logic service: hosts many games at once over HTTP, standing in locally for the GameLogic
+and AI endpoints of the web version.
+
+NOTES:
+    * Built on asyncio streams with a minimal HTTP/1.1 (keep-alive, JSON bodies) so it only needs the stdlib
+    * Each game is a GameSession holding a Board; the human plays Black and the AI plays White
+    * Human moves are validated with Board.determineCaptures() and played with Board.modifyLayout()
+    * AI moves are searched in a process pool, so the event loop keeps serving other games meanwhile
+    * Each pool worker keeps one AIPlayer (and its transposition table) for every game it is sent
+    * Passes are played automatically: a reply only comes back once the human can move or the game is over
+    * If the AI fails to answer (500), the human's move is taken back too, so it can simply be sent again
+    * Games left untouched for idleTimeout seconds are dropped
+    * With an archive path, every game is recorded (see GameArchive) when it ends, is deleted or is dropped;
+      games still in progress are recorded when the service stops, on Ctrl+C or SIGTERM
+
+Endpoints:
+    POST   /games               start a game
+    GET    /games/<id>          state of a game
+    POST   /games/<id>/move     play {"row": r, "column": c} for the human, answered by the AI
+    DELETE /games/<id>          end a game
+    GET    /stats               session count, AI move count and time, and resident memory
+
+Usage:
+    python GameService.py --port 8765 --workers 4 --archive server.oga
+'''
+
+
+import sys, os, time, json, signal, asyncio, argparse, itertools
+from concurrent.futures import ProcessPoolExecutor
+from OthelloEngine import Board, AIPlayer
+
+
+HUMAN = 'B'
+AI = 'W'
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 500: "Internal Server Error"}
+
+# The AI of each pool worker process
+WORKER_AI = None
+
+
+def initAIWorker(lookAhead, tableBytes, endgameEmpties):
+    '''Creates the AI a pool worker uses for every game it is sent'''
+    global WORKER_AI
+    WORKER_AI = AIPlayer(Board(), lookAhead, tableBytes=tableBytes, endgameEmpties=endgameEmpties)
+
+
+def chooseAIMove(board):
+    '''Worker task: returns (move, seconds) for the AI on board, which has White to move'''
+    start = time.perf_counter()
+    WORKER_AI.board = board
+    move = WORKER_AI.chooseMove(board.copy())
+    return move, time.perf_counter() - start
+
+
+def residentBytes():
+    '''Returns the memory this process currently holds, or its peak where that is all that can be read'''
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ServiceError(Exception):
+    '''A request the service refuses, answered with an HTTP status and a message'''
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class GameSession:
+    '''One hosted game: its board, whose turn it is, and when it was last played'''
+    __slots__ = ("id", "board", "color", "lock", "lastUsed", "recorder")
+
+    def __init__(self, id, archive=None):
+        self.id = id
+        self.board = Board()
+        self.color = HUMAN
+        self.lock = asyncio.Lock()
+        self.lastUsed = time.monotonic()
+        self.recorder = None if archive is None else archive.record(self.board)
+
+    def finish(self):
+        '''Records the game, if there is an archive'''
+        if self.recorder is not None:
+            self.recorder.finish()
+
+    def takeBack(self, records):
+        '''Takes back the moves of the undo records, played in that order, and gives the turn back to the human'''
+        for record in reversed(records):
+            self.board.undoMove(record)
+        if self.recorder is not None:
+            self.recorder.takeBack(len(records))
+        self.color = HUMAN
+
+    def state(self, aiMoves=None):
+        '''Returns the game as a JSON-ready dictionary, listing the human's legal moves on their turn'''
+        moves = []
+        if self.color == HUMAN and not self.board.endState:
+            moves = Board.bitPositions(self.board.legalMoves(HUMAN))
+        state = {"id": self.id, "board": self.board.toString(), "score": self.board.score,
+                 "toMove": None if self.board.endState else self.color, "over": self.board.endState,
+                 "moves": moves}
+        if aiMoves is not None:
+            state["aiMoves"] = aiMoves
+        return state
+
+
+class GameService:
+    '''Serves games to any number of HTTP clients from one event loop'''
+
+    def __init__(self, workers=None, lookAhead=2, tableBytes=4 * 2 ** 20, endgameEmpties=8, idleTimeout=3600,
+                 archivePath=None):
+        self.sessions = {}
+        self.archive = None
+        if archivePath is not None:
+            from GameArchive import GameArchiveWriter
+            self.archive = GameArchiveWriter(archivePath)
+        self.ids = itertools.count(1)
+        self.idleTimeout = idleTimeout
+        self.pool = ProcessPoolExecutor(workers, initializer=initAIWorker,
+                                        initargs=(lookAhead, tableBytes, endgameEmpties))
+        self.aiMoves = 0
+        self.aiSeconds = 0
+
+    async def serve(self, host, port):
+        '''Accepts connections until cancelled'''
+        server = await asyncio.start_server(self.handleConnection, host, port)
+        reaper = asyncio.ensure_future(self.dropIdleSessions())
+
+        # A normal shutdown (SIGTERM) unwinds like Ctrl+C, so the cleanup below still runs
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass
+        print("Serving games on http://%s:%d" % (host, port))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reaper.cancel()
+            self.pool.shutdown()
+            if self.archive is not None:
+                for session in self.sessions.values():
+                    session.finish()
+                self.archive.close()
+
+    async def dropIdleSessions(self):
+        '''Periodically forgets games nobody has played for idleTimeout seconds'''
+        while True:
+            await asyncio.sleep(min(60, self.idleTimeout))
+            cutoff = time.monotonic() - self.idleTimeout
+            for id in [id for id, session in self.sessions.items() if session.lastUsed < cutoff]:
+                self.sessions.pop(id).finish()
+
+    async def handleConnection(self, reader, writer):
+        '''Answers the requests of one connection in order until the client closes it'''
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if not requestLine:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, separator, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, path, version = requestLine.decode("latin-1").split()
+                    body = await reader.readexactly(int(headers.get("content-length", 0)))
+                    status, payload = await self.route(method, path, body)
+                except ServiceError as error:
+                    status, payload = error.status, {"error": error.message}
+                except ValueError:
+                    status, payload = 400, {"error": "malformed request"}
+                except asyncio.IncompleteReadError:
+                    raise
+                except Exception as error:
+                    # A crashed AI worker or a bug in a handler still gets the client an answer
+                    status, payload = 500, {"error": "%s: %s" % (type(error).__name__, error)}
+
+                data = json.dumps(payload).encode()
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                             % (status, REASONS[status].encode(), len(data)) + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        '''Returns (status, payload) for one request'''
+        parts = path.strip("/").split("/")
+        if parts == ["stats"]:
+            if method != "GET":
+                raise ServiceError(405, "use GET for stats")
+            return 200, {"sessions": len(self.sessions), "aiMoves": self.aiMoves, "aiSeconds": self.aiSeconds,
+                         "rssBytes": residentBytes()}
+
+        if parts[0] != "games" or len(parts) > 3:
+            raise ServiceError(404, "no such endpoint")
+        if len(parts) == 1:
+            if method != "POST":
+                raise ServiceError(405, "use POST to start a game")
+            session = GameSession(str(next(self.ids)), self.archive)
+            self.sessions[session.id] = session
+            return 201, session.state()
+
+        session = self.sessions.get(parts[1])
+        if session is None:
+            raise ServiceError(404, "no game %s" % parts[1])
+        session.lastUsed = time.monotonic()
+
+        if len(parts) == 3:
+            if parts[2] != "move":
+                raise ServiceError(404, "no such endpoint")
+            if method != "POST":
+                raise ServiceError(405, "use POST to play a move")
+            move = json.loads(body or b"{}")
+            try:
+                row, column = int(move["row"]), int(move["column"])
+            except (KeyError, TypeError):
+                raise ServiceError(400, "a move needs a row and a column")
+            return 200, await self.playMove(session, row, column)
+
+        if method == "GET":
+            return 200, session.state()
+        elif method == "DELETE":
+            del self.sessions[session.id]
+            session.finish()
+            return 200, {"id": session.id, "deleted": True}
+        raise ServiceError(405, "use GET or DELETE on a game")
+
+    async def playMove(self, session, row, column):
+        '''Plays the human's move in session and the AI's answers. Returns the new state'''
+        async with session.lock:
+            board = session.board
+            if board.endState:
+                raise ServiceError(409, "the game is over")
+            if session.color != HUMAN:
+                raise ServiceError(409, "it is not the human's turn")
+            captures = board.determineCaptures(HUMAN, row, column)
+            if captures == []:
+                raise ServiceError(400, "illegal move [%d,%d]" % (row, column))
+
+            records = [board.modifyLayout(HUMAN, row, column, captures)]
+            session.color = AI
+            try:
+                aiMoves = await self.answer(session, records)
+            except Exception:
+                # Without the AI's answer the whole request is taken back, so the human can play it again
+                session.takeBack(records)
+                raise
+            session.lastUsed = time.monotonic()
+            return session.state(aiMoves)
+
+    async def answer(self, session, records):
+        '''Plays passes and AI moves until the human can move or the game is over, adding the
+        undo record of every AI move to records. Returns the AI's moves'''
+        board = session.board
+        loop = asyncio.get_running_loop()
+        aiMoves = []
+        while not board.endState:
+            # The side to move has no legal move, so the turn goes back to the other one
+            if board.mustPass:
+                board.mustPass = False
+                session.color = Board.getOppositeColor(session.color)
+                continue
+            if session.color == HUMAN:
+                break
+
+            # A copy leaves the board's observers (the game recorder) behind
+            move, seconds = await loop.run_in_executor(self.pool, chooseAIMove, board.copy())
+            self.aiMoves += 1
+            self.aiSeconds += seconds
+            records += [board.modifyLayout(AI, move[0], move[1])]
+            session.color = HUMAN
+            aiMoves += [list(move)]
+        if board.endState:
+            session.finish()
+        return aiMoves
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Host many Othello games over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=None, help="AI processes (default: one per CPU)")
+    parser.add_argument("--look-ahead", type=int, default=2, help="AI search depth")
+    parser.add_argument("--table-bytes", type=int, default=4 * 2 ** 20, help="transposition table size per worker")
+    parser.add_argument("--endgame-empties", type=int, default=8, help="empties from which the AI solves exactly")
+    parser.add_argument("--idle-timeout", type=float, default=3600, help="seconds before an untouched game is dropped")
+    parser.add_argument("--archive", help="game archive file to record every game in")
+    options = parser.parse_args(arguments)
+
+    service = GameService(options.workers, options.look_ahead, options.table_bytes, options.endgame_empties,
+                          options.idle_timeout, options.archive)
+    try:
+        asyncio.run(service.serve(options.host, options.port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
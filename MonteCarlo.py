@@ -0,0 +1,390 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Monte Carlo tree search player: an alternative to AIPlayer's minimax that picks moves from the
+results of many random games played to the end (UCT).
+
+NOTES:
+    * Playouts run on raw (black, white) bitboards and never build a Board or generate moves:
+      every ply draws empty squares in a fresh random order until Board.computeFlips() finds
+      one that captures, which is a uniformly random legal move (squares with no opposing
+      neighbour are skipped without calling it)
+    * With guided set, playouts pick uniformly among the legal corners first, then among the
+      other squares, and play X-squares (diagonally next to a corner) only as a last resort
+    * A search is bounded by playouts, by seconds (timeBudget), or by whichever runs out first
+    * Each node keeps its visits and the wins of the side that moved into it; the move played is
+      the root's most visited child
+    * A pass is an ordinary tree move (PASS) when the side to move has no legal move
+    * The tree is kept between moves: moveToNextLevel() descends into the child that was played,
+      and its playouts count towards the next search
+    * With workers > 1 each process grows its own tree from the position and their root visits
+      are added up (root parallelization); each worker has a pool of its own, so it keeps its
+      tree between moves and finds the new position a few plies below its old root
+    * lastStats reports each search's playouts, time and playouts per second, and throughput
+      totals the whole game
+
+Usage:
+    python MonteCarlo.py --seconds 2 --workers 4     reports playout throughput from the initial position
+'''
+
+
+import sys, math, time, random, argparse
+from concurrent.futures import ProcessPoolExecutor
+from OthelloEngine import Board, Player
+
+
+# Tree move for a pass
+PASS = -1
+
+# The X-squares [2,2] [2,7] [7,2] [7,7], which give away the corner next to them
+X_SQUARES = 0x0042000000004200
+
+# The squares around each square: only a move next to an opposing chip can capture anything
+NEIGHBOURS = [sum(1 << ray[0] for ray in rays if ray) for rays in Board.raySquares]
+
+def playout(black, white, color, generator, guided=False):
+    '''Plays random moves from a position with color to move until the game ends.
+    Returns the winner, 'B' or 'W', or None for a draw'''
+    own, opponent = (black, white) if color == 'B' else (white, black)
+    computeFlips = Board.computeFlips
+    random = generator.random
+    empty = ~(black | white) & Board.FULL
+    if guided:
+        groups = [list(Board.squareIndices(empty & Board.CORNERS)),
+                  list(Board.squareIndices(empty & ~Board.CORNERS & ~X_SQUARES)),
+                  list(Board.squareIndices(empty & X_SQUARES))]
+    else:
+        groups = [list(Board.squareIndices(empty))]
+
+    # Count plies and passes from the side that started, swapping sides every turn
+    turns = 0
+    passes = 0
+    remaining = sum(len(group) for group in groups)
+    while remaining and passes < 2:
+        played = False
+        for group in groups:
+            # Partial Fisher-Yates: each ply draws the group's squares in a new random order
+            # and plays the first that captures, a uniform choice among its legal moves
+            size = len(group)
+            for drawn in range(size):
+                pick = drawn + int(random() * (size - drawn))
+                index = group[pick]
+                group[pick] = group[drawn]
+                group[drawn] = index
+                if not opponent & NEIGHBOURS[index]:
+                    continue
+                flips = computeFlips(own, opponent, index)
+                if flips:
+                    group[drawn] = group[-1]
+                    group.pop()
+                    own, opponent = opponent ^ flips, own | (1 << index) | flips
+                    played = True
+                    break
+            if played:
+                break
+        if played:
+            remaining -= 1
+            passes = 0
+        else:
+            own, opponent = opponent, own
+            passes += 1
+        turns += 1
+
+    ownCount, opponentCount = own.bit_count(), opponent.bit_count()
+    if ownCount == opponentCount:
+        return None
+    if turns % 2:
+        color = Board.getOppositeColor(color)
+    return color if ownCount > opponentCount else Board.getOppositeColor(color)
+
+
+def playMove(black, white, color, move):
+    '''Returns the (black, white) bitboards after color plays bit index move (or PASS)'''
+    if move == PASS:
+        return black, white
+    own, opponent = (black, white) if color == 'B' else (white, black)
+    flips = Board.computeFlips(own, opponent, move)
+    own, opponent = own | (1 << move) | flips, opponent ^ flips
+    return (own, opponent) if color == 'B' else (opponent, own)
+
+
+class MonteCarloNode:
+    '''A position in the search tree, with color to move'''
+    __slots__ = ("color", "children", "untried", "visits", "wins")
+
+    def __init__(self, black, white, color, generator):
+        self.color = color
+        self.children = {}
+        self.visits = 0
+        # Wins of the side that moved into this node, a draw counting half
+        self.wins = 0
+
+        own, opponent = (black, white) if color == 'B' else (white, black)
+        moves = Board.generateMoves(own, opponent)
+        if moves:
+            self.untried = list(Board.squareIndices(moves))
+            generator.shuffle(self.untried)
+        elif Board.generateMoves(opponent, own):
+            self.untried = [PASS]
+        else:
+            self.untried = []
+
+    def select(self, exploration):
+        '''Returns (move, child) of the child with the highest upper confidence bound'''
+        logVisits = math.log(self.visits)
+        best = None
+        bestBound = None
+        for move, child in self.children.items():
+            bound = child.wins / child.visits + exploration * math.sqrt(logVisits / child.visits)
+            if bestBound is None or bound > bestBound:
+                best, bestBound = (move, child), bound
+        return best
+
+
+class MonteCarloTree:
+    '''UCT search from one position, which can be grown further or moved down to a child'''
+
+    def __init__(self, black, white, color, exploration=1.4, guided=False, seed=None, maxNodes=1000000):
+        self.generator = random.Random(seed)
+        self.black = black
+        self.white = white
+        self.exploration = exploration
+        self.guided = guided
+        self.maxNodes = maxNodes
+        self.root = MonteCarloNode(black, white, color, self.generator)
+        self.nodes = 1
+
+    def search(self, playouts=None, seconds=None):
+        '''Runs playouts until either limit is reached (at least one must be given). Returns how many ran'''
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        count = 0
+        while (playouts is None or count < playouts) and (deadline is None or time.perf_counter() < deadline):
+            self.iterate()
+            count += 1
+        return count
+
+    def iterate(self):
+        '''Selects a leaf, expands one move below it, plays a game out from there and records the result'''
+        node = self.root
+        black, white = self.black, self.white
+        path = [node]
+
+        # Selection: follow the best bounds while every move has been tried
+        while not node.untried and node.children:
+            move, node = node.select(self.exploration)
+            black, white = playMove(black, white, path[-1].color, move)
+            path += [node]
+
+        # Expansion, unless the game is over here or the tree is full
+        if node.untried and self.nodes < self.maxNodes:
+            move = node.untried.pop()
+            black, white = playMove(black, white, node.color, move)
+            child = MonteCarloNode(black, white, Board.getOppositeColor(node.color), self.generator)
+            node.children[move] = child
+            self.nodes += 1
+            node = child
+            path += [node]
+
+        winner = playout(black, white, node.color, self.generator, self.guided)
+
+        # Each node is credited from the point of view of the side that moved into it
+        for node in path:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner != node.color:
+                node.wins += 1
+
+    def rootResults(self):
+        '''Returns {move: (visits, wins)} for every child of the root'''
+        return {move: (child.visits, child.wins) for move, child in self.root.children.items()}
+
+    def find(self, black, white, color, plies=3):
+        '''Makes the node holding the position with color to move the root, if it lies within plies
+        moves of the current root. Returns False if it is not in the tree'''
+        level = [(self.root, self.black, self.white)]
+        for ply in range(plies + 1):
+            nextLevel = []
+            for node, nodeBlack, nodeWhite in level:
+                if (nodeBlack, nodeWhite, node.color) == (black, white, color):
+                    self.root, self.black, self.white = node, nodeBlack, nodeWhite
+                    self.nodes = max(1, node.visits)
+                    return True
+                for move, child in node.children.items():
+                    nextLevel += [(child,) + playMove(nodeBlack, nodeWhite, node.color, move)]
+            level = nextLevel
+        return False
+
+    def descend(self, move):
+        '''Makes the child reached by move (a bit index or PASS) the root. Returns False if it was never expanded'''
+        child = self.root.children.get(move)
+        if child is None:
+            return False
+        self.black, self.white = playMove(self.black, self.white, self.root.color, move)
+        self.root = child
+        # Every node below was expanded by one of its playouts
+        self.nodes = max(1, child.visits)
+        return True
+
+
+# The tree each worker process keeps between the moves of its player
+WORKER_TREE = None
+
+
+def searchPosition(task):
+    '''Worker task: grows the worker's tree from a position, reusing it if the position is
+    reachable from its root. Returns (root results, playouts, playouts reused)'''
+    global WORKER_TREE
+    black, white, color, playouts, seconds, exploration, guided, seed, maxNodes = task
+    if WORKER_TREE is None or not WORKER_TREE.find(black, white, color):
+        WORKER_TREE = MonteCarloTree(black, white, color, exploration, guided, seed, maxNodes)
+    reused = WORKER_TREE.root.visits
+    count = WORKER_TREE.search(playouts, seconds)
+    return WORKER_TREE.rootResults(), count, reused
+
+
+class MonteCarloPlayer(Player):
+    def __init__(self, board, playouts=None, timeBudget=1.0, exploration=1.4, guided=False, workers=1,
+                 treeNodes=1000000, seed=None, color="W"):
+        '''color is the side the player plays. Each move runs playouts random games, or as many as
+        fit in timeBudget seconds, or stops at whichever comes first when both are given.
+        exploration is the UCT constant, guided makes the playouts take corners and avoid X-squares.
+        With workers > 1, that many processes search the position and pool their root visits.
+        Each kept tree never grows beyond treeNodes nodes'''
+        if playouts is None and timeBudget is None:
+            raise ValueError("MonteCarloPlayer needs playouts or a timeBudget")
+        self.board = board
+        self.playouts = playouts
+        self.timeBudget = timeBudget
+        self.exploration = exploration
+        self.guided = guided
+        self.workers = workers
+        self.pools = None
+        self.treeNodes = treeNodes
+        self.generator = random.Random(seed)
+        self.tree = None
+        self.lastStats = None
+        self.throughput = {"moves": 0, "playouts": 0, "seconds": 0}
+        self.AIColor = color
+
+    def makeMove(self):
+        move = self.chooseMove(self.board.copy())
+
+        # Without a legal move, the player must pass
+        if move is not None:
+            self.board.modifyLayout(self.AIColor, move[0], move[1])
+            self.moveToNextLevel(self.AIColor, move)
+        return move
+
+    def chooseMove(self, searchBoard):
+        '''Returns the best move for the player on searchBoard, or None if it must pass'''
+        if searchBoard.endState or not searchBoard.legalMoves(self.AIColor):
+            return None
+        start = time.perf_counter()
+
+        if self.workers > 1:
+            results, playouts, reused = self.parallelSearch(searchBoard)
+        else:
+            tree = self.treeFor(searchBoard)
+            reused = tree.root.visits
+            playouts = tree.search(self.playouts, self.timeBudget)
+            results = tree.rootResults()
+
+        # The most visited move is the most trusted one, ties going to the lower square
+        index = min(results, key=lambda move: (-results[move][0], move))
+        visits, wins = results[index]
+        seconds = time.perf_counter() - start
+
+        self.throughput["moves"] += 1
+        self.throughput["playouts"] += playouts
+        self.throughput["seconds"] += seconds
+        self.lastStats = {"move": list(Board.squarePosition(index)), "color": self.AIColor, "mode": "mcts",
+                          "value": wins / visits, "playouts": playouts, "reused": reused, "seconds": seconds,
+                          "playoutsPerSecond": playouts / seconds if seconds > 0 else None,
+                          "nodes": None if self.tree is None else self.tree.nodes}
+        return Board.squarePosition(index)
+
+    def treeFor(self, searchBoard):
+        '''Returns the kept tree if it is rooted at searchBoard with the player to move, or a new one'''
+        # Passes the tree holds are followed to the position too
+        if self.tree is not None and self.tree.find(searchBoard.black, searchBoard.white, self.AIColor):
+            return self.tree
+        self.tree = MonteCarloTree(searchBoard.black, searchBoard.white, self.AIColor, self.exploration,
+                                   self.guided, self.generator.getrandbits(64), self.treeNodes)
+        return self.tree
+
+    def parallelSearch(self, searchBoard):
+        '''Searches the position in every worker process.
+        Returns (summed root results, playouts, playouts reused from the workers' kept trees)'''
+        # One single-process pool per worker, so every search reaches the same worker and its tree
+        if self.pools is None:
+            self.pools = [ProcessPoolExecutor(1) for worker in range(self.workers)]
+        # Split a playout limit between the workers, while each gets the whole time budget
+        playouts = None if self.playouts is None else -(-self.playouts // self.workers)
+        futures = [pool.submit(searchPosition, (searchBoard.black, searchBoard.white, self.AIColor, playouts,
+                                                self.timeBudget, self.exploration, self.guided,
+                                                self.generator.getrandbits(64), self.treeNodes))
+                   for pool in self.pools]
+
+        results = {}
+        total = 0
+        reused = 0
+        for future in futures:
+            workerResults, count, workerReused = future.result()
+            total += count
+            reused += workerReused
+            for move, (visits, wins) in workerResults.items():
+                summed = results.get(move, (0, 0))
+                results[move] = (summed[0] + visits, summed[1] + wins)
+        return results, total, reused
+
+    def moveToNextLevel(self, color, moveID):
+        '''Keeps the subtree of the move color played, [row, column], or drops the tree if there is none'''
+        if self.tree is None:
+            return
+        # A pass the tree already holds comes before the move
+        if self.tree.root.color != color:
+            self.tree.descend(PASS)
+        index = Board.squareIndex(moveID[0], moveID[1])
+        if self.tree.root.color != color or not self.tree.descend(index):
+            self.tree = None
+
+    def close(self):
+        '''Shuts down the search process pools, if they were started'''
+        if self.pools is not None:
+            for pool in self.pools:
+                pool.shutdown()
+            self.pools = None
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Measure Monte Carlo tree search playout throughput")
+    parser.add_argument("--seconds", type=float, default=2.0, help="search time")
+    parser.add_argument("--workers", type=int, default=1, help="search processes")
+    parser.add_argument("--guided", action="store_true", help="corner-seeking playouts instead of uniform ones")
+    parser.add_argument("--position", help="board as Board.toString() writes it (default: initial position)")
+    parser.add_argument("--color", default="B", help="side to move")
+    options = parser.parse_args(arguments)
+
+    board = Board() if options.position is None else Board.fromString(options.position, options.color)
+    player = MonteCarloPlayer(board, timeBudget=options.seconds, guided=options.guided, workers=options.workers,
+                              color=options.color)
+    try:
+        move = player.chooseMove(board.copy())
+    finally:
+        player.close()
+    stats = player.lastStats
+    print("move %s, win rate %.3f: %d playouts in %.2fs, %.0f playouts/s"
+          % (move, stats["value"], stats["playouts"], stats["seconds"], stats["playoutsPerSecond"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
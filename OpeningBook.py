@@ -0,0 +1,220 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Opening book: best moves for common opening positions, precomputed by the engine's own search.
+
+NOTES:
+    * Positions are stored once per symmetry class: the board is rotated/reflected into the
+      orientation with the smallest bitboards, and the move is stored in that orientation
+    * The file is a 16 byte header (magic, entry count) followed by entries sorted by key,
+      each packed as key (8 bytes), move index (1 byte) and score (2 bytes)
+    * The key is the Zobrist hash of the canonical position and the side to move
+    * Lookups binary search the file through mmap, so it is never read into memory as a whole
+    * Scores are the searched values from the perspective of Black, clamped to 16 bits
+
+Usage:
+    python OpeningBook.py openings.book --plies 10 --depth 4
+'''
+
+
+import sys, mmap, struct, time, argparse
+from OthelloEngine import Board, StateNode, TranspositionTable
+from PatternEvaluation import PatternState, loadWeights
+
+
+MAGIC = b"OTHBOOK1"
+HEADER = struct.Struct("<8sQ")
+ENTRY = struct.Struct("<QBh")
+
+
+def symmetryTable(transform):
+    '''Returns the square each bit index is sent to by transform(row, column), using 0-7 coordinates'''
+    table = []
+    for index in range(64):
+        row, column = transform(index // 8, index % 8)
+        table += [row * 8 + column]
+    return table
+
+
+# The eight rotations and reflections of the board, as square permutations
+SYMMETRIES = [symmetryTable(lambda row, column: (row, column)),
+              symmetryTable(lambda row, column: (column, row)),
+              symmetryTable(lambda row, column: (7 - row, column)),
+              symmetryTable(lambda row, column: (row, 7 - column)),
+              symmetryTable(lambda row, column: (7 - row, 7 - column)),
+              symmetryTable(lambda row, column: (7 - column, 7 - row)),
+              symmetryTable(lambda row, column: (column, 7 - row)),
+              symmetryTable(lambda row, column: (7 - column, row))]
+
+
+def transformBits(bits, symmetry):
+    '''Returns bits with every square moved by the symmetry permutation'''
+    result = 0
+    while bits:
+        bit = bits & -bits
+        bits ^= bit
+        result |= 1 << symmetry[bit.bit_length() - 1]
+    return result
+
+
+def canonicalPosition(black, white):
+    '''Returns (black, white, symmetry) for the orientation of the position with the smallest bitboards'''
+    best = None
+    for symmetry in SYMMETRIES:
+        candidate = (transformBits(black, symmetry), transformBits(white, symmetry), symmetry)
+        if best is None or candidate[:2] < best[:2]:
+            best = candidate
+    return best
+
+
+def positionKey(black, white, color):
+    '''Returns the Zobrist key of a (canonical) position with color to move'''
+    key = Board.sideKeys[color]
+    for chipColor, bits in (('B', black), ('W', white)):
+        while bits:
+            bit = bits & -bits
+            bits ^= bit
+            key ^= Board.zobristKeys[chipColor][bit.bit_length() - 1]
+    return key
+
+
+class OpeningBook:
+    '''Read-only view of a book file, searched in place through mmap'''
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.entries = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or HEADER.size + self.entries * ENTRY.size > len(self.map):
+            self.close()
+            raise ValueError("%s is not an opening book" % path)
+
+    def lookup(self, board, color):
+        '''Returns (position, score) of the book move for color on board, or None if it is not in the book'''
+        black, white, symmetry = canonicalPosition(board.black, board.white)
+        key = positionKey(black, white, color)
+
+        # Binary search the sorted entries in the mapped file
+        low = 0
+        high = self.entries
+        while low < high:
+            middle = (low + high) // 2
+            entryKey, index, score = ENTRY.unpack_from(self.map, HEADER.size + middle * ENTRY.size)
+            if entryKey < key:
+                low = middle + 1
+            elif entryKey > key:
+                high = middle
+            else:
+                # Turn the stored move back into this board's orientation
+                actual = symmetry.index(index)
+                return Board.squarePosition(actual), score
+        return None
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def rankMoves(board, color, depth, table=None):
+    '''Searches every legal move of color to depth and returns [(value, bit index)] best first'''
+    ranked = []
+    moves = board.legalMoves(color)
+    while moves:
+        move = moves & -moves
+        moves ^= move
+        index = move.bit_length() - 1
+        record = board.applyMove(color, index, board.determineFlips(color, index))
+        value = StateNode(Board.squarePosition(index)).evaluateStateAlphaBeta(board, color, depth, 1,
+                                                                              float("-inf"), float("inf"), table)
+        board.undoMove(record)
+        ranked += [(value, index)]
+
+    # Black wants the highest value and White the lowest, ties going to the lower square
+    if color == 'B':
+        ranked.sort(key=lambda entry: (-entry[0], entry[1]))
+    else:
+        ranked.sort(key=lambda entry: (entry[0], entry[1]))
+    return ranked
+
+
+def clampScore(value):
+    '''Fits a searched value into the 16 bit score field'''
+    return int(max(-32767, min(32767, value)))
+
+
+def buildBook(path, plies=10, fullPlies=4, width=2, depth=4, tableBytes=64 * 2 ** 20, weightsPath=None,
+              verbose=True):
+    '''Writes a book covering every position within fullPlies of the start, and beyond that the
+    width best moves of each side up to plies deep, each searched to depth with the pattern
+    evaluation of weightsPath (or the default weights). Returns the entry count'''
+    table = TranspositionTable(tableBytes)
+    entries = {}
+    start = Board()
+    start.patterns = PatternState(start, loadWeights(weightsPath))
+    frontier = [(start, 'B')]
+    startTime = time.perf_counter()
+
+    for ply in range(plies):
+        nextFrontier = []
+        for board, color in frontier:
+            # A pass leaves the same board with the other side to move
+            if board.endState:
+                continue
+            if not board.legalMoves(color):
+                nextFrontier += [(board, Board.getOppositeColor(color))]
+                continue
+
+            black, white, symmetry = canonicalPosition(board.black, board.white)
+            key = positionKey(black, white, color)
+            if key in entries:
+                continue
+
+            ranked = rankMoves(board, color, depth, table)
+            value, index = ranked[0]
+            entries[key] = (symmetry[index], clampScore(value))
+
+            # Past the opening every move is kept, later only the strongest lines
+            if ply >= fullPlies:
+                ranked = ranked[:width]
+            for value, index in ranked:
+                nextBoard = board.copy()
+                nextBoard.applyMove(color, index, nextBoard.determineFlips(color, index))
+                nextFrontier += [(nextBoard, Board.getOppositeColor(color))]
+
+        frontier = nextFrontier
+        if verbose:
+            print("ply %2d: %7d entries, %7.1fs" % (ply + 1, len(entries), time.perf_counter() - startTime))
+
+    with open(path, "wb") as output:
+        output.write(HEADER.pack(MAGIC, len(entries)))
+        for key in sorted(entries):
+            index, score = entries[key]
+            output.write(ENTRY.pack(key, index, score))
+    return len(entries)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Build an opening book with the engine's own search")
+    parser.add_argument("path", help="book file to write")
+    parser.add_argument("--plies", type=int, default=10, help="how many plies from the start the book covers")
+    parser.add_argument("--full-plies", type=int, default=4, help="plies in which every move is expanded")
+    parser.add_argument("--width", type=int, default=2, help="moves expanded per position after that")
+    parser.add_argument("--depth", type=int, default=4, help="lookAhead used to search each position")
+    parser.add_argument("--weights", help="pattern weights file (default: built-in weights)")
+    options = parser.parse_args(arguments)
+
+    count = buildBook(options.path, options.plies, options.full_plies, options.width, options.depth,
+                      weightsPath=options.weights)
+    print("Wrote %d positions to %s" % (count, options.path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,16 +9,21 @@
 
 '''
 NOTES:
-    * Any given space can be black 'B', white, 'W', empty ' ', periphery '@' or wall 'X'
-    * In order to make move choosing efficient, the board keeps track of all peripheries -- areas around other chips
-    * The board has a dictionary linking all peripheries coordinates with the direction of nearby chips
-    * Thus, to search for possible moves, one should check the periphery list and evaluate the linked directions
+    * This file is the pygame client; the board and AI live in the headless OthelloEngine module
+    * The client draws moves by registering drawMove() as an observer of the board
+    * The main loop sleeps until an event arrives, runs at most MAX_FPS frames a second, and only
+      sends the screen areas drawn since the last frame (DIRTY_RECTS) to the display
+    * The status bar only redraws the fields whose values changed
+
+Usage:
+    python Othello.py                play against the AI
+    python Othello.py --measure      also print the client's frame rate, frame time and CPU use
 '''
 
 
-import pygame, sys, copy
-from abc import ABC, abstractmethod
+import pygame, sys, time
 from pygame.locals import *
+from OthelloEngine import Board, StateNode, Player, HumanPlayer, AIPlayer
 
 # Initialize pygame library
 pygame.init()
@@ -33,387 +38,70 @@ GREEN = (0, 255, 0)
 YELLOW = (255, 255, 0)
 LIGHT_BLUE = (123, 196, 255)
 
+# Frame-rate cap, and the screen areas drawn since the last frame was shown
+MAX_FPS = 30
+DIRTY_RECTS = []
 
-class Board:
-    '''Represents the game board in member variable "configuration" and possesses
-    methods determineCaptures() and modifyLayout* to seek viable moves and
-    excecute them, respectively'''
-    # Codenames for direction values in the form of [rowShift, columnShift]
-    N = [-1, 0]
-    NE = [-1, 1]
-    E = [0, 1]
-    SE = [1, 1]
-    S = [1, 0]
-    SW = [1, -1]
-    W = [0, -1]
-    NW = [-1, -1]
-    directions = [N, NE, E, SE, S, SW, W, NW]
+# Status bar values currently on screen, by field
+STATUS = {}
 
-    def __init__(self):
-        '''Creates an Othello board in the initial state'''
-        self.configuration = [['X', 'X', 'X', 'X', 'X', 'X', 'X', 'X', 'X', 'X'],
-                              ['X', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', 'X'],
-                              ['X', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', 'X'],
-                              ['X', ' ', ' ', '@', '@', '@', '@', ' ', ' ', 'X'],
-                              ['X', ' ', ' ', '@', 'B', 'W', '@', ' ', ' ', 'X'],
-                              ['X', ' ', ' ', '@', 'W', 'B', '@', ' ', ' ', 'X'],
-                              ['X', ' ', ' ', '@', '@', '@', '@', ' ', ' ', 'X'],
-                              ['X', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', 'X'],
-                              ['X', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', 'X'],
-                              ['X', 'X', 'X', 'X', 'X', 'X', 'X', 'X', 'X', 'X']]
-        self.score = [2, 2]
-        self.mustPass = False
-        self.endState = False
-
-
-        self.peripheries = {(5, 3): [Board.NE, Board.E],
-                            (6, 3): [Board.NE],
-                            (6, 4): [Board.NE, Board.N],
-                            (6, 5): [Board.N, Board.NW],
-                            (6, 6): [Board.NW],
-                            (5, 6): [Board.W, Board.NW],
-                            (4, 6): [Board.SW, Board.W],
-                            (3, 6): [Board.SW],
-                            (3, 5): [Board.SW, Board.S],
-                            (3, 4): [Board.S, Board.SE],
-                            (3, 3): [Board.SE],
-                            (4, 3): [Board.E, Board.SE]}
-
-    def print(self):
-        print(" ---------- ")
-        num = 0
-        print("  0 1 2 3 4 5 6 7 8 9")
-        for row in self.configuration:
-            print(num, end=' ')
-            num += 1
-            for element in row:
-                if element == 'B':
-                    print('□', end=' ')
-                elif element == 'W':
-                    print('■', end=' ')
-                else:
-                    print(element, end=' ')
-            print("\n", end='')
-        print(" ---------- ")
-
-    @staticmethod
-    def getOppositeColor(color):
-        '''Returns black if color is white, white if color is black, and N/A otherwise'''
-        if color == 'B':
-            return 'W'
-        elif color == 'W':
-            return 'B'
-        else:
-            return "N/A"
-
-    @staticmethod
-    def getOppositeDirection(direction):
-        '''Returns direction opposite to input'''
-        return [-1*direction[0], -1*direction[1]]
-
-    def searchLine(self, color, row, column, direction):
-        '''Searches a list of directions and attempts to find
-        a piece of the same color (making a legal move).
-        Returns the position of all capturable pieces
-        resulting from playing on position [row,column]'''
-
-        oppositeColor = Board.getOppositeColor(color)
-        capturablePieces = []
-
-        # Look ahead to next location
-        row += direction[0]
-        column += direction[1]
-
-        # If immediately adjacent chip is not of opposite color, the move is illegal
-        if self.configuration[row][column] != oppositeColor:
-            return []
-
-        # Update looping variables
-        capturablePieces = [[row, column]]
-        row += direction[0]
-        column += direction[1]
-
-        # Another chip along the line must be of the same color
-        while True:
-            currentColor = self.configuration[row][column]
-
-            # If an opposite colored chip is found, it may be capturable if the move is legal
-            if currentColor == oppositeColor:
-                capturablePieces += [[row, column]]
-
-            # If a same colored chip was found, the result found is valid
-            elif currentColor == color:
-                return capturablePieces
-
-            # If an empty tile  or wall is found, move is illegal after all
-            else:
-                return []
-
-            # Move onto the next tile
-            row += direction[0]
-            column += direction[1]
-
-        # If loop conditions were not met, the move is illegal after all
-        return []
-
-    def determineCaptures(self, color, row, column):
-        '''Returns a list with the position of all pieces that would be captured by a given move'''
-
-        # Only peripheral positions can possibly have any captures
-        if self.configuration[row][column] != '@':
-            return []
-
-        capturablePieces = []
-
-        # Determine directions to search
-        pos = (row, column)
-        searchDirections = self.peripheries[pos]
-
-        # Search those directions
-        for d in searchDirections:
-            capturablePieces += self.searchLine(color, row, column, d)
-        return capturablePieces
-
-
-    def modifyLayout(self, color, row, column, captures=None, redraw=True):
-        '''Modifies the board by making positions listed in captures of a given color.
-        If no capture list is provided, it is calculated on the spot.
-        If the move is illegal, Illegal is returned'''
-
-        # If not provided, determine which chips will be captured with this move
-        if captures == None:
-            captures = self.determineCaptures(color, row, column)
-        # If no chips will be captured, return error
-        if captures == []:
-            return "Illegal"
-
-        # Branch function behavior depending on move color
-        if color == 'B':
-            myScore = 0
-            opponentScore = 1
-            penColor = BLACK;
-
-        else:
-            myScore = 1
-            opponentScore = 0
-            penColor = WHITE;
-
-        # Capture and redraw chips
-        self.configuration[row][column] = color
-
-        if redraw:
-            pygame.draw.circle(DISPLAY, penColor, [column * 50 - 25, row * 50 - 25], 20)
-
-        for position in captures:
-            self.configuration[position[0]][position[1]] = color
-            if redraw:
-                pygame.draw.circle(DISPLAY, penColor, [position[1] * 50 - 25, position[0] * 50 - 25], 20)
-
-        # Update score
-        numCaptures = len(captures)
-        self.score[myScore] += numCaptures + 1
-        self.score[opponentScore] -= numCaptures
-
-        # Update periphery values
-        self.updatePeripheries(row, column)
-
-        # Determine if new state is a pass/end state
-        self.determinePassEnd(color)
-
-
-    def updatePeripheries(self, row, column):
-        '''Turns empty (' ') squares around position row,column into peripheries ('@')
-        Updates nearby preexisting peripheries with new borderDirection entry'''
-
-        # Remove move square from peripheries
-        pos = (row, column)
-        del self.peripheries[pos]
-
-        for d in self.directions:
-            pos = (row + d[0], column + d[1])
-
-            # If empty square, add to periphery list
-            if self.configuration[pos[0]][pos[1]] == ' ':
-                self.configuration[pos[0]][pos[1]] = '@'
-                self.peripheries[pos] = [Board.getOppositeDirection(d)]
-
-            # If already a periphery, add a new direction to check
-            elif self.configuration[pos[0]][pos[1]] == '@':
-                self.peripheries[pos] += [Board.getOppositeDirection(d)]
-
-    def determinePassEnd(self, color):
-        '''Determines a player must pass or if current configuration is a final state
-        Returns True if either we must pass or if it is an end state'''
-
-        # Search all peripheries
-        for peri in self.peripheries:
-
-            # Translate location string to ints
-            row, column = peri
-
-            # If at least single piece is capturable, then no need to pass
-            if self.determineCaptures(color, row, column) != []:
-                self.mustPass = False
-                return False
-
-        # If no move was legal, we must run the function a second time
-        # for the opposite color to determine whether state is pass or end
-        if not self.mustPass:
-            self.mustPass = True
-            self.endState = self.determinePassEnd(Board.getOppositeColor(color))
-
-        # If we get to this point, then our current state is an end state
-        return True
-
-
-
-
-
-
-
-class StateNode:
-    def __init__(self, id, board):
-        self.children = {}
-        self.value = None
-        self.id = id
-        self.board = board
 
-    def populateChildren(self, color):
+def drawMove(color, row, column, captures):
+    '''Board observer that draws a newly placed chip and the chips it captured'''
+    if color == 'B':
+        penColor = BLACK
+    else:
+        penColor = WHITE
+    DIRTY_RECTS.append(pygame.draw.circle(DISPLAY, penColor, [column * 50 - 25, row * 50 - 25], 20))
+    for position in captures:
+        DIRTY_RECTS.append(pygame.draw.circle(DISPLAY, penColor, [position[1] * 50 - 25, position[0] * 50 - 25], 20))
 
-        # Verify which captures are legal moves
-        for peri in self.board.peripheries:
-            captures = self.board.determineCaptures(color, peri[0], peri[1])
-            if captures == []:
-                continue
-            else:
-                nextBoard = copy.deepcopy(self.board)
-                nextBoard.modifyLayout(color, peri[0], peri[1], captures, redraw=False)
-                self.children[peri] = StateNode(peri, nextBoard)
 
-                #print(color, "move @", peri, "captures", captures)
-                #self.board.print()
-                #print("↓")
-                #nextBoard.print()
+def drawStatus(turnNo, board):
+    '''Redraws the status bar fields that changed since they were last drawn'''
+    fields = [("turn", 'Turn: %d ' % turnNo, (25, 425)),
+              ("black", 'Black: %d  ' % board.score[0], (140, 425)),
+              ("white", 'White: %d  ' % board.score[1], (268, 425))]
+    for name, text, position in fields:
+        if STATUS.get(name) != text:
+            STATUS[name] = text
+            DIRTY_RECTS.append(DISPLAY.blit(FONT.render(text, True, BLACK, LIGHT_BLUE), position))
 
-    def heuristicEvaluation1(self):
-        '''Evaluate state non-recursively with heuristic from the perspective of Black'''
-        return self.board.score[0]
+    toMove = BLACK if turnNo % 2 else WHITE
+    if STATUS.get("toMove") != toMove:
+        STATUS["toMove"] = toMove
+        DIRTY_RECTS.append(pygame.draw.circle(DISPLAY, toMove, (58, 470), 20))
 
-    def evaluateState(self, color, maxDepth, currentDepth=1):
-        '''Evaluates state desirability recursively from the perspective of Black'''
-        #print(currentDepth)
-
-        # Exit recursion at a certain depth
-        if currentDepth > maxDepth:
-            self.value = self.heuristicEvaluation1()
-            return self.value
-
-        # If end state, no need to keep searching
-        elif self.board.endState:
-
-            if self.board.score[0] > board.score[1]:
-                self.value = float("inf")
-                return float("inf")
-
-            elif self.board.score[0] < board.score[1]:
-                self.value = float("inf")
-                return float("-inf")
-
-            else:
-                self.value = 0
-                return 0
-
-        elif self.board.mustPass:
-            self.value = self.evaluateState(Board.getOppositeColor(color), maxDepth, currentDepth + 1)
-            print("passcase")
-            return self.value
-
-        # Explore each child, keeping max/min values encountered
-        minimum = float('inf')
-        maximum = float('-inf')
-
-        #print(color)
-        #self.board.print()
-        self.populateChildren(Board.getOppositeColor(color))
-
-        for child in self.children.values():
-            childVal = child.evaluateState(Board.getOppositeColor(color), maxDepth, currentDepth + 1)
-            if color == "W" and childVal < minimum:
-                minimum = childVal
-
-            elif color =="B" and childVal > maximum:
-                maximum = childVal
-
-        # Value of node is max/min of child values
-        if color == "W":
-            self.value = minimum
-        else:
-            self.value = maximum
-
-        return self.value
-
-
-class Player(ABC):
-    @abstractmethod
-    def makeMove(self):
-        pass
-
-class HumanPlayer(Player):
-    @staticmethod
-    def makeMove():
-        pass
-
-class AIPlayer(Player):
-    def __init__(self, board, lookAhead=2):
-        self.stateTree = StateNode((0, 0), Board())
-        self.board = board
-        self.lookAhead = lookAhead
-        self.AIColor = "W"
-
-        self.stateTree.populateChildren(Board.getOppositeColor(self.AIColor))
-
-    def makeMove(self):
-        # Selecting the minimum element in the child eval list
-        minimum = float('inf')
-        move = None
-
-        # Before starting a recursive search, check if path has already been explored
-        print("children", self.stateTree.children)
-        if self.stateTree.children != {}:
-            minChild = min(self.stateTree.children.values(), key=lambda child: child.value)
-            move = minChild.id
-            print("Skipped Eval")
-
-        else:
-            # Populate children list with potential moves
-            if self.stateTree.children == {}:
-                self.stateTree.populateChildren(self.AIColor)
-            # Evaluate the value of each legal move and keep track of the minimum
-            for child in self.stateTree.children.values():
-                evaluation = child.evaluateState(self.AIColor, self.lookAhead)
-                #print("min",minimum)
-                #print("eval",evaluation)
-                if evaluation < minimum:
-                     minimum = evaluation
-                     move = child.id
-
-        # Make the best move (worst for black)
-        self.board.modifyLayout(self.AIColor, move[0], move[1]) #ADD: If child empty, PASS
-        self.moveToNextLevel(self.AIColor, move)
-        #print("AI made a move at", move[0], ",", move[1], "Beep")
-
-    def moveToNextLevel(self, color, moveID):
-        # Populate children list with potential moves
-        if self.stateTree.children == {}:
-            self.stateTree.populateChildren(color)
-        newRoot = self.stateTree.children[moveID]
-        print("root")
-        newRoot.board.print()
-        self.stateTree = newRoot
 
+class FrameMeter:
+    '''Measurement mode: sums up frame times and CPU use, printing them every INTERVAL seconds.
+    Client CPU is the main thread's alone; process CPU also counts the AI's pondering thread'''
+    INTERVAL = 5
 
+    def __init__(self):
+        self.reset()
 
+    def reset(self):
+        self.start = time.perf_counter()
+        self.clientStart = time.thread_time()
+        self.processStart = time.process_time()
+        self.frames = 0
+        self.busy = 0
+        self.worst = 0
 
+    def frame(self, seconds):
+        '''Counts one frame that took seconds of work, reporting once the interval is over'''
+        self.frames += 1
+        self.busy += seconds
+        self.worst = max(self.worst, seconds)
+        elapsed = time.perf_counter() - self.start
+        if elapsed >= FrameMeter.INTERVAL:
+            client = time.thread_time() - self.clientStart
+            process = time.process_time() - self.processStart
+            print("%5.1f frames/s, frame time %7.2f ms average %7.2f ms worst, client CPU %5.1f%%, process CPU %5.1f%%"
+                  % (self.frames / elapsed, 1000 * self.busy / self.frames, 1000 * self.worst,
+                     100 * client / elapsed, 100 * process / elapsed))
+            self.reset()
 
 
 
@@ -443,6 +131,11 @@ def othelloInit():
     DISPLAY.blit(FONT.render('White: 2', True, BLACK, LIGHT_BLUE), (268, 425))
     pygame.draw.rect(DISPLAY, BLACK, [337, 472, 60, 20])
     DISPLAY.blit(FONT.render('Reset', True, BLACK, GREEN), (340, 475))
+    STATUS.clear()
+    STATUS.update({"turn": 'Turn: 1 ', "black": 'Black: 2  ', "white": 'White: 2  ', "toMove": BLACK})
+
+    # The whole window is new
+    DIRTY_RECTS.append(DISPLAY.get_rect())
 
 
 
@@ -453,7 +146,12 @@ def othelloInit():
 
     # Initialize board and AI
     board = Board()
-    return board, 'B', 1, AIPlayer(board) # AIPlayer(board)
+    board.addObserver(drawMove)
+    ai = AIPlayer(board, ponder=True)
+
+    # The AI thinks about its answers while the human chooses the first move
+    ai.startPondering()
+    return board, 'B', 1, ai
 
 
 
@@ -464,9 +162,21 @@ if __name__ == "__main__":
     board, color, turnNo, ai = othelloInit()
     moveSFX = pygame.mixer.Sound('movesfx.wav')
     turnPlayer = 'B'
+    clock = pygame.time.Clock()
+    meter = FrameMeter() if "--measure" in sys.argv[1:] else None
+    pygame.display.update()
+    del DIRTY_RECTS[:]
 
     while True:
-        for event in pygame.event.get():
+        # Sleep until something happens (waking regularly to report when measuring)
+        if meter is None:
+            events = [pygame.event.wait()]
+        else:
+            events = [pygame.event.wait(1000)]
+        events += pygame.event.get()
+        frameStart = time.perf_counter()
+
+        for event in events:
             if event.type == MOUSEBUTTONDOWN and turnNo % 2:
                 x = event.pos[0]
                 y = event.pos[1]
@@ -481,20 +191,14 @@ if __name__ == "__main__":
                         board.modifyLayout(color, row, column, captures)
                         ai.moveToNextLevel(turnPlayer,(row,column))
                         color = board.getOppositeColor(color)
-                        board.print()
                         turnNo += 1
-                        DISPLAY.blit(FONT.render('Turn: %d ' % turnNo, True, BLACK, LIGHT_BLUE), (25, 425))
-                        DISPLAY.blit(FONT.render('Black: %d  ' % board.score[0], True, BLACK, LIGHT_BLUE), (140, 425))
-                        DISPLAY.blit(FONT.render('White: %d  ' % board.score[1], True, BLACK, LIGHT_BLUE), (268, 425))
-                        if (turnNo % 2):
-                            pygame.draw.circle(DISPLAY, BLACK, (58, 470), 20)
-                        else:
-                            pygame.draw.circle(DISPLAY, WHITE, (58, 470), 20)
+                        drawStatus(turnNo, board)
                 elif 340 <= x <= 395 and 475 <= y <= 495:
                     print("Clicked reset!")
                     pygame.draw.rect(DISPLAY, WHITE, (337, 472, 60, 20))
                     DISPLAY.blit(FONT.render('Reset', True, BLACK, YELLOW),(340,475))
-                    pygame.display.update()
+                    pygame.display.update((337, 472, 60, 20))
+                    ai.close()
                     board, color, turnNo, ai = othelloInit()
 
 
@@ -504,22 +208,27 @@ if __name__ == "__main__":
                     ai.makeMove()
                     moveSFX.play()
                     color = board.getOppositeColor(color)
-                    board.print()
                     turnNo += 1
-                    DISPLAY.blit(FONT.render('Turn: %d ' % turnNo, True, BLACK, LIGHT_BLUE), (25, 425))
-                    DISPLAY.blit(FONT.render('Black: %d  ' % board.score[0], True, BLACK, LIGHT_BLUE), (140, 425))
-                    DISPLAY.blit(FONT.render('White: %d  ' % board.score[1], True, BLACK, LIGHT_BLUE), (268, 425))
-                    if (turnNo % 2):
-                        pygame.draw.circle(DISPLAY, BLACK, (58, 470), 20)
-                    else:
-                        pygame.draw.circle(DISPLAY, WHITE, (58, 470), 20)
+                    drawStatus(turnNo, board)
 
 
 
+            # Parts of the window that were covered need drawing again
+            elif event.type == VIDEOEXPOSE:
+                DIRTY_RECTS.append(DISPLAY.get_rect())
+
             elif event.type == QUIT:
+                ai.close()
                 pygame.quit()
                 sys.exit()
-        pygame.display.update()
+
+        # Only what was drawn this frame is sent to the display
+        if DIRTY_RECTS:
+            pygame.display.update(DIRTY_RECTS)
+            del DIRTY_RECTS[:]
+        if meter is not None:
+            meter.frame(time.perf_counter() - frameStart)
+        clock.tick(MAX_FPS)
 
 """
     while True:
@@ -0,0 +1,1369 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Headless Othello engine: the board, state search and AI players, with no pygame dependency.
+
+NOTES:
+    * Each color's chips are kept as a 64-bit integer, bit (row - 1) * 8 + (column - 1) standing for [row,column]
+    * Legal moves are found by shifting those integers along the eight directions
+    * Captures are found with per-square ray tables: each of a square's rays is precomputed as a
+      bitboard, so the chips closed off along it come from a couple of bit operations
+    * Each color's legal moves are cached on the board until a move changes it, and undoing a move
+      restores the cache of the position before it, so a search never generates them twice
+    * Rows and columns still count from 1 to 8, as they did on the old 10x10 walled board
+    * Anything that wants to show the game (e.g. the pygame client) registers a callback with Board.addObserver()
+    * Import time can be measured with: python -X importtime -c "import OthelloEngine"
+'''
+
+
+import sys, math, random, time, threading
+from array import array
+from abc import ABC, abstractmethod
+
+
+# Random number source for Zobrist keys, seeded so every process hashes positions identically
+ZOBRIST_RANDOM = random.Random(20190418)
+
+
+def buildRays(directions):
+    '''Returns, for every bit index, the bit indices met walking from it to the edge of the board
+    in each of directions ([rowShift, columnShift] pairs), nearest first'''
+    rays = []
+    for index in range(64):
+        squareRays = []
+        for rowShift, columnShift in directions:
+            ray = []
+            row, column = index // 8 + rowShift, index % 8 + columnShift
+            while 0 <= row < 8 and 0 <= column < 8:
+                ray += [row * 8 + column]
+                row += rowShift
+                column += columnShift
+            squareRays += [tuple(ray)]
+        rays += [squareRays]
+    return rays
+
+
+def buildRayMasks(rays):
+    '''Returns, for every bit index, (bitboard of the ray, whether it runs towards higher bits)
+    for each of its rays long enough to capture along (two squares or more)'''
+    masks = []
+    for squareRays in rays:
+        lines = []
+        for ray in squareRays:
+            if len(ray) >= 2:
+                mask = 0
+                for square in ray:
+                    mask |= 1 << square
+                lines += [(mask, ray[1] > ray[0])]
+        masks += [lines]
+    return masks
+
+
+class Board:
+    '''Represents the game board as a pair of 64-bit integers (one per color) and possesses
+    methods determineCaptures() and modifyLayout* to seek viable moves and
+    excecute them, respectively'''
+    # Codenames for direction values in the form of [rowShift, columnShift]
+    N = [-1, 0]
+    NE = [-1, 1]
+    E = [0, 1]
+    SE = [1, 1]
+    S = [1, 0]
+    SW = [1, -1]
+    W = [0, -1]
+    NW = [-1, -1]
+    directions = [N, NE, E, SE, S, SW, W, NW]
+
+    # For each bit index, the squares along each direction, and the same rays as bitboards
+    raySquares = buildRays(directions)
+    rayMasks = buildRayMasks(raySquares)
+
+    # Bit masks used to stop shifted chips from wrapping around the board edges
+    FULL = 0xFFFFFFFFFFFFFFFF
+    NOT_FIRST_COLUMN = 0xFEFEFEFEFEFEFEFE
+    NOT_LAST_COLUMN = 0x7F7F7F7F7F7F7F7F
+
+    # The four corners, which can never be captured once taken
+    CORNERS = 0x8100000000000081
+
+    # Zobrist keys for a chip of each color on each square, and for the side to move
+    zobristKeys = {'B': [ZOBRIST_RANDOM.getrandbits(64) for i in range(64)],
+                   'W': [ZOBRIST_RANDOM.getrandbits(64) for i in range(64)]}
+    sideKeys = {'B': ZOBRIST_RANDOM.getrandbits(64), 'W': ZOBRIST_RANDOM.getrandbits(64)}
+    # Key change when a chip on a square switches color
+    flipKeys = [black ^ white for black, white in zip(zobristKeys['B'], zobristKeys['W'])]
+
+    # Bit shift and edge mask equivalent to each entry in directions
+    shifts = [(-8, FULL), (-7, NOT_FIRST_COLUMN), (1, NOT_FIRST_COLUMN), (9, NOT_FIRST_COLUMN),
+              (8, FULL), (7, NOT_LAST_COLUMN), (-1, NOT_LAST_COLUMN), (-9, NOT_LAST_COLUMN)]
+
+    def __init__(self):
+        '''Creates an Othello board in the initial state'''
+        self.black = Board.squareBit(4, 4) | Board.squareBit(5, 5)
+        self.white = Board.squareBit(4, 5) | Board.squareBit(5, 4)
+        self.score = [2, 2]
+        self.mustPass = False
+        self.endState = False
+        self.hash = self.computeHash()
+        self.observers = []
+        self.patterns = None
+        self.forgetMoves()
+
+    def forgetMoves(self):
+        '''Drops the cached legal moves; required after changing black or white directly'''
+        self.blackMoves = None
+        self.whiteMoves = None
+
+    def computeHash(self):
+        '''Returns the Zobrist hash of the chips on the board, calculated from scratch'''
+        hash = 0
+        for color, bits in (('B', self.black), ('W', self.white)):
+            while bits:
+                bit = bits & -bits
+                hash ^= Board.zobristKeys[color][bit.bit_length() - 1]
+                bits ^= bit
+        return hash
+
+    def copy(self):
+        '''Returns an independent copy of the board'''
+        board = Board.__new__(Board)
+        board.black = self.black
+        board.white = self.white
+        board.score = self.score[:]
+        board.mustPass = self.mustPass
+        board.endState = self.endState
+        board.hash = self.hash
+        board.blackMoves = self.blackMoves
+        board.whiteMoves = self.whiteMoves
+        board.observers = []
+        if self.patterns is None:
+            board.patterns = None
+        else:
+            board.patterns = self.patterns.copy()
+        return board
+
+    def addObserver(self, observer):
+        '''Registers observer(color, row, column, captures) to be called after every move modifyLayout() draws,
+        e.g. to redraw the chips or to record the game'''
+        self.observers += [observer]
+
+    @staticmethod
+    def fromString(text, color):
+        '''Creates a board from 64 squares listed row by row as 'B', 'W' or '-' (or '.'),
+        with color to move. Raises ValueError if text does not describe a board'''
+        squares = "".join(text.split())
+        if len(squares) != 64 or set(squares) - set("BW-.") or color not in ('B', 'W'):
+            raise ValueError("Not a board: %r with %r to move" % (text, color))
+
+        board = Board.__new__(Board)
+        board.black = 0
+        board.white = 0
+        for index, square in enumerate(squares):
+            if square == 'B':
+                board.black |= 1 << index
+            elif square == 'W':
+                board.white |= 1 << index
+        board.score = [board.black.bit_count(), board.white.bit_count()]
+        board.hash = board.computeHash()
+        board.observers = []
+        board.patterns = None
+        board.forgetMoves()
+
+        # Flags describe the side to move, as if the other color had just played
+        board.mustPass = False
+        board.endState = False
+        board.determinePassEnd(Board.getOppositeColor(color))
+        return board
+
+    def toString(self):
+        '''Returns the 64 squares row by row as 'B', 'W' or '-', the format fromString() reads'''
+        squares = []
+        for index in range(64):
+            if self.black >> index & 1:
+                squares += ['B']
+            elif self.white >> index & 1:
+                squares += ['W']
+            else:
+                squares += ['-']
+        return "".join(squares)
+
+    def print(self):
+        print(" ---------- ")
+        num = 0
+        print("  0 1 2 3 4 5 6 7 8 9")
+        for row in self.configuration:
+            print(num, end=' ')
+            num += 1
+            for element in row:
+                if element == 'B':
+                    print('□', end=' ')
+                elif element == 'W':
+                    print('■', end=' ')
+                else:
+                    print(element, end=' ')
+            print("\n", end='')
+        print(" ---------- ")
+
+    @staticmethod
+    def getOppositeColor(color):
+        '''Returns black if color is white, white if color is black, and N/A otherwise'''
+        if color == 'B':
+            return 'W'
+        elif color == 'W':
+            return 'B'
+        else:
+            return "N/A"
+
+    @staticmethod
+    def getOppositeDirection(direction):
+        '''Returns direction opposite to input'''
+        return [-1*direction[0], -1*direction[1]]
+
+    @staticmethod
+    def squareIndex(row, column):
+        '''Returns the bit index (0-63) of position [row,column], or None if it lies outside the 8x8 grid'''
+        if 1 <= row <= 8 and 1 <= column <= 8:
+            return (row - 1) * 8 + (column - 1)
+        return None
+
+    @staticmethod
+    def squareBit(row, column):
+        '''Returns a bitboard with only position [row,column] set'''
+        return 1 << ((row - 1) * 8 + (column - 1))
+
+    @staticmethod
+    def squarePosition(index):
+        '''Returns the (row, column) position of a bit index'''
+        return (index // 8 + 1, index % 8 + 1)
+
+    @staticmethod
+    def bitPositions(bits):
+        '''Returns the [row, column] position of every bit set in a bitboard'''
+        positions = []
+        while bits:
+            bit = bits & -bits
+            index = bit.bit_length() - 1
+            positions += [[index // 8 + 1, index % 8 + 1]]
+            bits ^= bit
+        return positions
+
+    @staticmethod
+    def shift(bits, amount, mask):
+        '''Moves every chip in bits one step along a direction, dropping those that leave the board'''
+        if amount > 0:
+            return (bits << amount) & mask
+        return (bits >> -amount) & mask
+
+    def getBitboards(self, color):
+        '''Returns the (own, opponent) bitboards from the perspective of color'''
+        if color == 'B':
+            return self.black, self.white
+        return self.white, self.black
+
+    def legalMoves(self, color):
+        '''Returns a bitboard of every position where color can legally play'''
+        if color == 'B':
+            if self.blackMoves is None:
+                self.blackMoves = Board.generateMoves(self.black, self.white)
+            return self.blackMoves
+        if self.whiteMoves is None:
+            self.whiteMoves = Board.generateMoves(self.white, self.black)
+        return self.whiteMoves
+
+    def mobility(self, color):
+        '''Returns how many legal moves color has'''
+        return self.legalMoves(color).bit_count()
+
+    @staticmethod
+    def generateMoves(own, opponent):
+        '''Returns a bitboard of every position where the owner of own can legally play'''
+        empty = ~(own | opponent) & Board.FULL
+        moves = 0
+
+        # Flood each direction through up to six opposing chips, landing on an empty square
+        for amount, mask in Board.shifts:
+            line = Board.shift(own, amount, mask) & opponent
+            line |= Board.shift(line, amount, mask) & opponent
+            line |= Board.shift(line, amount, mask) & opponent
+            line |= Board.shift(line, amount, mask) & opponent
+            line |= Board.shift(line, amount, mask) & opponent
+            line |= Board.shift(line, amount, mask) & opponent
+            moves |= Board.shift(line, amount, mask) & empty
+        return moves
+
+    def determineFlips(self, color, index):
+        '''Returns a bitboard of all pieces that would be captured by color playing on bit index'''
+        own, opponent = self.getBitboards(color)
+        return Board.computeFlips(own, opponent, index)
+
+    @staticmethod
+    def computeFlips(own, opponent, index):
+        '''Returns a bitboard of the opponent pieces the owner of own would capture by playing on bit index'''
+        # Occupied squares can never be played
+        if (own | opponent) >> index & 1:
+            return 0
+
+        flips = 0
+        for ray, ascending in Board.rayMasks[index]:
+            # The first square along the ray that isn't an opposing chip ends the line,
+            # which is captured if that square holds one of our own
+            blockers = ray & ~opponent
+            if ascending:
+                first = blockers & -blockers
+                if first & own:
+                    flips |= ray & (first - 1)
+            elif blockers:
+                first = 1 << (blockers.bit_length() - 1)
+                if first & own:
+                    flips |= ray & -(first << 1)
+        return flips
+
+    def flipIndices(self, color, index):
+        '''Returns the bit indices of the chips color would capture by playing on bit index, as a byte array'''
+        return Board.squareIndices(self.determineFlips(color, index))
+
+    @staticmethod
+    def squareIndices(bits):
+        '''Returns the bit index of every bit set in a bitboard, in increasing order, as a byte array'''
+        indices = array("B")
+        while bits:
+            bit = bits & -bits
+            indices.append(bit.bit_length() - 1)
+            bits ^= bit
+        return indices
+
+    @property
+    def configuration(self):
+        '''Returns the board as a 10x10 list of 'B', 'W', ' ', '@' and 'X' squares'''
+        occupied = self.black | self.white
+        periphery = 0
+        for amount, mask in Board.shifts:
+            periphery |= Board.shift(occupied, amount, mask)
+        periphery &= ~occupied
+
+        configuration = [['X'] * 10]
+        for row in range(1, 9):
+            line = ['X']
+            for column in range(1, 9):
+                bit = Board.squareBit(row, column)
+                if self.black & bit:
+                    line += ['B']
+                elif self.white & bit:
+                    line += ['W']
+                elif periphery & bit:
+                    line += ['@']
+                else:
+                    line += [' ']
+            configuration += [line + ['X']]
+        return configuration + [['X'] * 10]
+
+    @property
+    def peripheries(self):
+        '''Returns a dictionary linking every periphery position with the directions of nearby chips'''
+        occupied = self.black | self.white
+        peripheries = {}
+        for row, column in Board.bitPositions(~occupied & Board.FULL):
+            bit = Board.squareBit(row, column)
+            for d, (amount, mask) in zip(Board.directions, Board.shifts):
+                if Board.shift(bit, amount, mask) & occupied:
+                    peripheries.setdefault((row, column), []).append(d)
+        return peripheries
+
+    def searchLine(self, color, row, column, direction):
+        '''Searches along a single direction and attempts to find
+        a piece of the same color (making a legal move).
+        Returns the position of all capturable pieces
+        resulting from playing on position [row,column]'''
+        own, opponent = self.getBitboards(color)
+        index = Board.squareIndex(row, column)
+        if index is None:
+            return []
+
+        line = []
+        for square in Board.raySquares[index][Board.directions.index(direction)]:
+            if not opponent >> square & 1:
+                # The line is only capturable if it is closed by a chip of the same color
+                if own >> square & 1:
+                    return [list(Board.squarePosition(captured)) for captured in line]
+                break
+            line += [square]
+        return []
+
+    def determineCaptures(self, color, row, column):
+        '''Returns a list with the position of all pieces that would be captured by a given move'''
+        index = Board.squareIndex(row, column)
+        if index is None:
+            return []
+        return [[square // 8 + 1, square % 8 + 1] for square in self.flipIndices(color, index)]
+
+    def modifyLayout(self, color, row, column, captures=None, redraw=True):
+        '''Modifies the board by making positions listed in captures of a given color.
+        If no capture list is provided, it is calculated on the spot.
+        Returns an undo record for undoMove(), or Illegal if the move is illegal'''
+        index = Board.squareIndex(row, column)
+        if index is None:
+            return "Illegal"
+
+        # If not provided, determine which chips will be captured with this move
+        if captures == None:
+            flips = self.determineFlips(color, index)
+        else:
+            flips = 0
+            for position in captures:
+                flips |= Board.squareBit(position[0], position[1])
+        # If no chips will be captured, return error
+        if not flips:
+            return "Illegal"
+
+        record = self.applyMove(color, index, flips)
+
+        # Let observers such as the pygame client redraw the chips
+        if redraw and self.observers:
+            captures = Board.bitPositions(flips)
+            for observer in self.observers:
+                observer(color, row, column, captures)
+
+        return record
+
+    def applyMove(self, color, index, flips):
+        '''Places a chip of color on bit index and captures every chip in the flips bitboard.
+        Returns an undo record that undoMove() uses to restore the previous state'''
+        record = (color, index, flips, self.mustPass, self.endState, self.hash, self.blackMoves, self.whiteMoves)
+        move = 1 << index
+        numCaptures = flips.bit_count()
+
+        # Update hash with the new chip and every chip that changes color
+        hash = self.hash ^ Board.zobristKeys[color][index]
+        bits = flips
+        while bits:
+            bit = bits & -bits
+            hash ^= Board.flipKeys[bit.bit_length() - 1]
+            bits ^= bit
+        self.hash = hash
+
+        # Keep the evaluation patterns in step, if any are attached
+        if self.patterns is not None:
+            self.patterns.place(color, index, flips)
+
+        # Capture chips and update score
+        if color == 'B':
+            self.black |= move | flips
+            self.white ^= flips
+            self.score[0] += numCaptures + 1
+            self.score[1] -= numCaptures
+        else:
+            self.white |= move | flips
+            self.black ^= flips
+            self.score[1] += numCaptures + 1
+            self.score[0] -= numCaptures
+
+        # Determine if new state is a pass/end state, which also caches the moves of the side to move
+        self.blackMoves = None
+        self.whiteMoves = None
+        self.determinePassEnd(color)
+        return record
+
+    def undoMove(self, record):
+        '''Takes back the move described by an undo record from applyMove() or modifyLayout()'''
+        color, index, flips, self.mustPass, self.endState, self.hash, self.blackMoves, self.whiteMoves = record
+        move = 1 << index
+        numCaptures = flips.bit_count()
+
+        if self.patterns is not None:
+            self.patterns.place(color, index, flips, -1)
+
+        # Return captured chips to their owner and restore score
+        if color == 'B':
+            self.black ^= move | flips
+            self.white |= flips
+            self.score[0] -= numCaptures + 1
+            self.score[1] += numCaptures
+        else:
+            self.white ^= move | flips
+            self.black |= flips
+            self.score[1] -= numCaptures + 1
+            self.score[0] += numCaptures
+
+    def determinePassEnd(self, color):
+        '''Determines if the opponent of color (who just moved) must pass or if current configuration is a final state
+        Returns True if either they must pass or if it is an end state'''
+
+        # If at least a single piece is capturable, then no need to pass
+        if self.legalMoves(Board.getOppositeColor(color)):
+            self.mustPass = False
+            self.endState = False
+            return False
+
+        # If the opponent has no legal move, the state is an end state unless we can play again
+        self.mustPass = True
+        self.endState = not self.legalMoves(color)
+        return True
+
+
+
+
+
+
+
+class TranspositionTable:
+    '''Fixed-size cache of search results keyed by Zobrist hash. Each bucket holds a
+    depth-preferred entry and an always-replace entry, so deep results survive while
+    recent shallow ones still get cached'''
+    # Bound types describing how a stored value relates to the true value
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    # Memory taken by one entry: its list slot, tuple, key and value, each object rounded up to the
+    # 16 bytes Python's allocator hands out. The depth, bound and best move (a bit index) are small
+    # ints that Python shares, so they cost nothing extra
+    ENTRY_BYTES = 8 + sum(-(-sys.getsizeof(item) // 16) * 16 for item in ((0, 0, 0, 0, 0), 2 ** 63, 0.0))
+
+    def __init__(self, maxBytes=16 * 2 ** 20):
+        '''Creates an empty table holding as many entries as fit in maxBytes'''
+        self.buckets = max(1, maxBytes // (2 * TranspositionTable.ENTRY_BYTES))
+        self.entries = [None] * (2 * self.buckets)
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+        self.stores = 0
+
+    def probe(self, key):
+        '''Returns the (key, depth, bound, value, bestMove) entry stored for key, or None.
+        bestMove is the bit index of the move, or None'''
+        slot = 2 * (key % self.buckets)
+        entry = self.entries[slot]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = self.entries[slot + 1]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, bound, value, bestMove):
+        '''Saves a search result, replacing the shallower or older entry in its bucket'''
+        slot = 2 * (key % self.buckets)
+        deep = self.entries[slot]
+
+        # Results at least as deep as the current one (or for the same position) take the first slot
+        if deep is None or deep[0] == key or depth >= deep[1]:
+            if deep is not None and deep[0] != key:
+                self.overwrites += 1
+        else:
+            slot += 1
+            recent = self.entries[slot]
+            if recent is not None and recent[0] != key:
+                self.overwrites += 1
+
+        self.entries[slot] = (key, depth, bound, value, bestMove)
+        self.stores += 1
+
+    def clear(self):
+        '''Empties the table and resets its counters'''
+        self.entries = [None] * (2 * self.buckets)
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+        self.stores = 0
+
+    def stats(self):
+        '''Returns usage counters for sizing the table'''
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "overwrites": self.overwrites,
+                "stores": self.stores,
+                "capacity": len(self.entries),
+                "used": len(self.entries) - self.entries.count(None),
+                "bytes": len(self.entries) * TranspositionTable.ENTRY_BYTES}
+
+
+class SearchTimeout(Exception):
+    '''Raised from inside a search once its SearchBudget has run out'''
+    pass
+
+
+class SearchBudget:
+    '''Limits a search to a wall-clock time and/or a number of visited nodes. Without limits
+    it only counts the nodes and cutoffs of a search, for AIPlayer's stats'''
+    # The clock is only read once every this many nodes (must be a power of two)
+    CLOCK_INTERVAL = 64
+
+    def __init__(self, seconds=None, nodes=None):
+        self.start = time.perf_counter()
+        self.deadline = None if seconds is None else self.start + seconds
+        self.maxNodes = nodes
+        self.nodes = 0
+        self.cutoffs = 0
+        self.stopped = False
+
+    def stop(self):
+        '''Makes the search using this budget time out at its next node, from any thread'''
+        self.stopped = True
+
+    def spend(self):
+        '''Counts one visited node, raising SearchTimeout if the budget is exhausted or stopped'''
+        self.nodes += 1
+        if self.stopped:
+            raise SearchTimeout()
+        if self.maxNodes is not None and self.nodes > self.maxNodes:
+            raise SearchTimeout()
+        if self.deadline is not None and not self.nodes & (SearchBudget.CLOCK_INTERVAL - 1):
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+
+    def elapsed(self):
+        '''Returns the seconds since the budget was created'''
+        return time.perf_counter() - self.start
+
+
+class StateNode:
+    '''Node of the search tree AIPlayer keeps between moves. It holds no board, only the move
+    leading to it, the hash of the position its children were generated from, and search results'''
+    __slots__ = ("children", "value", "id", "bestMove", "hash")
+
+    def __init__(self, id):
+        self.children = {}
+        self.value = None
+        self.id = id
+        self.bestMove = None
+        self.hash = None
+
+    def populateChildren(self, board, color):
+        '''Adds a child for every legal move of color on board, which must hold this node's position'''
+        self.hash = board.hash ^ Board.sideKeys[color]
+        moves = board.legalMoves(color)
+        while moves:
+            move = moves & -moves
+            moves ^= move
+            position = Board.squarePosition(move.bit_length() - 1)
+            self.children[position] = StateNode(position)
+
+    def orderChildren(self, board, color, remainingDepth):
+        '''Returns the children sorted so that likely cutoffs are searched first:
+        the previous best move, then corners, then moves leaving the opponent fewest replies'''
+        own, opponent = board.getBitboards(color)
+        keys = {}
+        for position, child in self.children.items():
+            index = Board.squareIndex(position[0], position[1])
+            move = 1 << index
+
+            # Mobility is only worth computing when the children will be expanded further
+            mobility = 0
+            if remainingDepth > 1:
+                flips = board.determineFlips(color, index)
+                mobility = Board.generateMoves(opponent ^ flips, own | move | flips).bit_count()
+
+            keys[position] = (position != self.bestMove, not move & Board.CORNERS, mobility)
+
+        return sorted(self.children.values(), key=lambda child: keys[child.id])
+
+    @staticmethod
+    def heuristicEvaluation1(board):
+        '''Evaluate state non-recursively with heuristic from the perspective of Black'''
+        return board.score[0]
+
+    @staticmethod
+    def heuristicEvaluation(board, color):
+        '''Evaluate state non-recursively from the perspective of Black, color having just moved.
+        Uses the board's pattern tables when they are attached, and heuristicEvaluation1 otherwise'''
+        if board.patterns is not None:
+            return board.patterns.evaluate(board, color)
+        return board.score[0]
+
+    @staticmethod
+    def endStateEvaluation(board):
+        '''Evaluate a finished game from the perspective of Black'''
+        if board.score[0] > board.score[1]:
+            return float("inf")
+
+        elif board.score[0] < board.score[1]:
+            return float("-inf")
+
+        else:
+            return 0
+
+    def evaluateState(self, board, color, maxDepth, currentDepth=1):
+        '''Evaluates state desirability recursively from the perspective of Black.
+        board must hold this node's position after color moved; moves are made on it
+        in place and taken back, so it is left unchanged when this returns'''
+
+        # Exit recursion at a certain depth
+        if currentDepth > maxDepth:
+            self.value = StateNode.heuristicEvaluation(board, color)
+            return self.value
+
+        # If end state, no need to keep searching
+        elif board.endState:
+            self.value = StateNode.endStateEvaluation(board)
+            return self.value
+
+        # If the opponent must pass, the same color moves again
+        if board.mustPass:
+            mover = color
+        else:
+            mover = Board.getOppositeColor(color)
+
+        # Explore each child, keeping max/min values encountered
+        minimum = float('inf')
+        maximum = float('-inf')
+
+        if self.children == {}:
+            self.populateChildren(board, mover)
+
+        for child in self.children.values():
+            index = Board.squareIndex(child.id[0], child.id[1])
+            record = board.applyMove(mover, index, board.determineFlips(mover, index))
+            childVal = child.evaluateState(board, mover, maxDepth, currentDepth + 1)
+            board.undoMove(record)
+
+            if mover == "W" and childVal < minimum:
+                minimum = childVal
+
+            elif mover == "B" and childVal > maximum:
+                maximum = childVal
+
+        # Value of node is max/min of child values
+        if mover == "W":
+            self.value = minimum
+        else:
+            self.value = maximum
+
+        return self.value
+
+    def evaluateStateAlphaBeta(self, board, color, maxDepth, currentDepth=1, alpha=float("-inf"), beta=float("inf"),
+                               table=None, budget=None):
+        '''Evaluates state desirability like evaluateState(), skipping children that cannot
+        change the result. The value is exact when it lies strictly between alpha and beta,
+        otherwise it is a bound on the same side of the window as the true value.
+        Results are shared through table, a TranspositionTable, when one is given.
+        If budget runs out SearchTimeout is raised and board is left mid-search'''
+        if budget is not None:
+            budget.spend()
+
+        # Exit recursion at a certain depth
+        if currentDepth > maxDepth:
+            self.value = StateNode.heuristicEvaluation(board, color)
+            return self.value
+
+        # If end state, no need to keep searching
+        elif board.endState:
+            self.value = StateNode.endStateEvaluation(board)
+            return self.value
+
+        # If the opponent must pass, the same color moves again
+        if board.mustPass:
+            mover = color
+        else:
+            mover = Board.getOppositeColor(color)
+
+        # Only reuse results searched to exactly the same remaining depth, so the value
+        # stays identical to a plain minimax search of this depth
+        remainingDepth = maxDepth - currentDepth
+        if table is not None:
+            key = board.hash ^ Board.sideKeys[mover]
+            entry = table.probe(key)
+            if entry is not None:
+                depth, bound, value = entry[1], entry[2], entry[3]
+                if depth == remainingDepth and (bound == TranspositionTable.EXACT or
+                                                (bound == TranspositionTable.LOWER and value >= beta) or
+                                                (bound == TranspositionTable.UPPER and value <= alpha)):
+                    self.value = value
+                    return self.value
+                if self.bestMove is None and entry[4] is not None:
+                    self.bestMove = Board.squarePosition(entry[4])
+            originalAlpha = alpha
+            originalBeta = beta
+
+        if self.children == {}:
+            self.populateChildren(board, mover)
+
+        # Black raises alpha and White lowers beta until the window closes
+        if mover == "B":
+            value = float("-inf")
+        else:
+            value = float("inf")
+
+        bestMove = None
+        for child in self.orderChildren(board, mover, remainingDepth):
+            index = Board.squareIndex(child.id[0], child.id[1])
+            record = board.applyMove(mover, index, board.determineFlips(mover, index))
+            childVal = child.evaluateStateAlphaBeta(board, mover, maxDepth, currentDepth + 1, alpha, beta, table, budget)
+            board.undoMove(record)
+
+            if mover == "B" and (childVal > value or bestMove is None):
+                value = childVal
+                bestMove = child.id
+                alpha = max(alpha, value)
+
+            elif mover == "W" and (childVal < value or bestMove is None):
+                value = childVal
+                bestMove = child.id
+                beta = min(beta, value)
+
+            if alpha >= beta:
+                if budget is not None:
+                    budget.cutoffs += 1
+                break
+
+        self.bestMove = bestMove
+        self.value = value
+
+        if table is not None:
+            if value <= originalAlpha:
+                bound = TranspositionTable.UPPER
+            elif value >= originalBeta:
+                bound = TranspositionTable.LOWER
+            else:
+                bound = TranspositionTable.EXACT
+            # The move is kept as its bit index, so entries hold no tuple of their own
+            table.store(key, remainingDepth, bound, value, None if bestMove is None else Board.squareIndex(*bestMove))
+
+        return self.value
+
+
+# Transposition table private to each search worker process, kept between moves
+WORKER_TABLE = None
+
+
+def initSearchWorker(tableBytes, evaluation="discs", weightsPath=None):
+    '''Prepares a worker process of AIPlayer's pool, loading the pattern weights before any search starts'''
+    global WORKER_TABLE
+    if tableBytes:
+        WORKER_TABLE = TranspositionTable(tableBytes)
+    if evaluation == "patterns":
+        from PatternEvaluation import loadWeights
+        loadWeights(weightsPath)
+
+
+def searchRootMove(board, color, position, lookAhead, alpha, beta, deadline=None, nodes=None, count=False):
+    '''Evaluates the root move of color at position in a worker process, within (alpha, beta).
+    deadline is a time.time() the search must finish by, however long the task waited in the queue.
+    Returns (value, nodes visited, cutoffs), with a value of None if the budget ran out.
+    Nodes and cutoffs are only counted with a budget or with count set'''
+    budget = None
+    if deadline is not None or nodes is not None or count:
+        seconds = None
+        if deadline is not None:
+            seconds = deadline - time.time()
+            if seconds <= 0:
+                return None, 0, 0
+        budget = SearchBudget(seconds, nodes)
+
+    index = Board.squareIndex(position[0], position[1])
+    board.applyMove(color, index, board.determineFlips(color, index))
+    try:
+        value = StateNode(position).evaluateStateAlphaBeta(board, color, lookAhead, 1, alpha, beta,
+                                                           WORKER_TABLE, budget)
+    except SearchTimeout:
+        return None, budget.nodes, budget.cutoffs
+    if budget is None:
+        return value, 0, 0
+    return value, budget.nodes, budget.cutoffs
+
+
+class Player(ABC):
+    @abstractmethod
+    def makeMove(self):
+        pass
+
+class HumanPlayer(Player):
+    @staticmethod
+    def makeMove():
+        pass
+
+class AIPlayer(Player):
+    def __init__(self, board, lookAhead=2, searchMode="alphabeta", tableBytes=16 * 2 ** 20,
+                 timeBudget=None, nodeBudget=None, workers=1, endgameEmpties=10, endgameMode="exact",
+                 bookPath=None, evaluation="patterns", weightsPath=None, treeNodes=100000, ponder=False,
+                 color="W", stats=False, traceFile=None):
+        '''color is the side the AI plays: as everywhere in the engine, values are from the
+        perspective of Black, so a White AI picks the lowest one and a Black AI the highest.
+        searchMode is either "minimax" or "alphabeta", which always selects the same move.
+        Alpha-beta shares results through a transposition table of about tableBytes (0 disables it).
+        Setting timeBudget (seconds) and/or nodeBudget replaces the fixed lookAhead with
+        iterative deepening that keeps the move of the deepest search finished within budget.
+        With workers > 1, alpha-beta root moves are shared out to a pool of that many processes,
+        which still selects exactly the move a single process would.
+        With endgameEmpties or fewer empty squares left the game is solved exactly instead,
+        in endgameMode "exact" (disc difference) or "wld" (win/loss/draw).
+        Positions found in the opening book file at bookPath are played without searching.
+        evaluation is "patterns" for the pattern tables (weightsPath, or the defaults) or "discs"
+        for heuristicEvaluation1. Between moves at most treeNodes nodes of the search tree are
+        kept, those nearest the root; their size is reported in treeStats.
+        With ponder set, alpha-beta keeps searching the opponent's likely replies in a background
+        thread while waiting for the opponent to move (see startPondering), visiting at most
+        treeNodes nodes and then cutting the tree back down to treeNodes.
+        With stats set, every move leaves a report of its search in lastStats (see searchReport),
+        which is also appended as a line of JSON to traceFile if one is given. Without stats,
+        nodes are not even counted'''
+        self.stateTree = StateNode((0, 0))
+        self.board = board
+        self.lookAhead = lookAhead
+        self.searchMode = searchMode
+        self.timeBudget = timeBudget
+        self.nodeBudget = nodeBudget
+        self.lastDepth = None
+        self.workers = workers
+        self.pool = None
+        self.endgameEmpties = endgameEmpties
+        self.endgameMode = endgameMode
+        self.lastSolve = None
+        self.evaluation = evaluation
+        self.weightsPath = weightsPath
+        # Building the default tables takes a while, so it is done here rather than in a budgeted move
+        self.weights = None
+        if evaluation == "patterns":
+            from PatternEvaluation import loadWeights
+            self.weights = loadWeights(weightsPath)
+        self.treeNodes = treeNodes
+        self.treeStats = {"nodes": 1, "bytes": 0}
+        self.ponder = ponder
+        self.ponderThread = None
+        self.ponderBudget = None
+        self.lastPonder = None
+        self.stats = stats
+        self.traceFile = traceFile
+        self.lastStats = None
+        self.depthStats = []
+        if bookPath is not None:
+            from OpeningBook import OpeningBook
+            self.openingBook = OpeningBook(bookPath)
+        else:
+            self.openingBook = None
+        if tableBytes:
+            self.transpositionTable = TranspositionTable(tableBytes)
+        else:
+            self.transpositionTable = None
+        self.AIColor = color
+
+    def makeMove(self):
+        # The tree and table must not change under the search
+        self.stopPondering()
+
+        # The whole search walks a single private copy of the game board
+        move = self.chooseMove(self.board.copy())
+
+        # Without a legal move, the AI must pass
+        if move is not None:
+            # Make the best move (worst for black)
+            self.board.modifyLayout(self.AIColor, move[0], move[1])
+            self.moveToNextLevel(self.AIColor, move)
+
+        # Use the opponent's thinking time to prepare the next answer
+        if self.ponder:
+            self.startPondering()
+        return move
+
+    def chooseMove(self, searchBoard):
+        '''Returns the best move for the AI on searchBoard, or None if it must pass'''
+        if not self.stats:
+            return self.selectMove(searchBoard)[0]
+
+        start = time.perf_counter()
+        tableBefore = None
+        if self.transpositionTable is not None:
+            tableBefore = self.transpositionTable.stats()
+        self.depthStats = []
+        move, mode, budget = self.selectMove(searchBoard)
+        self.lastStats = self.searchReport(move, mode, budget, time.perf_counter() - start, tableBefore)
+
+        if self.traceFile is not None:
+            import json
+            with open(self.traceFile, "a") as trace:
+                trace.write(json.dumps(self.lastStats) + "\n")
+        return move
+
+    def selectMove(self, searchBoard):
+        '''Returns (move, how it was chosen, the budget that counted its search or None)'''
+        # Discard the explored children if they were generated for another position
+        if self.stateTree.hash != searchBoard.hash ^ Board.sideKeys[self.AIColor]:
+            self.stateTree.children = {}
+            self.stateTree.bestMove = None
+
+        # Known openings are played straight from the book
+        if self.openingBook is not None:
+            entry = self.openingBook.lookup(searchBoard, self.AIColor)
+            if entry is not None and searchBoard.determineFlips(self.AIColor, Board.squareIndex(entry[0][0], entry[0][1])):
+                self.lastDepth = None
+                self.stateTree.value = entry[1]
+                return entry[0], "book", None
+
+        # Close to the end of the game, play it out perfectly
+        if 64 - searchBoard.score[0] - searchBoard.score[1] <= self.endgameEmpties:
+            return self.endgameRoot(searchBoard), "endgame", None
+
+        # Only the heuristic searches below evaluate positions
+        self.attachPatterns(searchBoard)
+
+        if self.timeBudget is not None or self.nodeBudget is not None:
+            budget = SearchBudget(self.timeBudget, self.nodeBudget)
+            return self.iterativeDeepeningRoot(searchBoard, budget), "iterative", budget
+
+        self.lastDepth = self.lookAhead
+        if self.searchMode == "alphabeta":
+            # Nodes are only counted when someone wants the numbers
+            budget = SearchBudget() if self.stats else None
+            move = self.alphaBetaRoot(searchBoard, self.lookAhead, budget)
+            if budget is not None:
+                self.depthStats = [{"depth": self.lookAhead, "nodes": budget.nodes, "seconds": budget.elapsed(),
+                                    "move": move, "value": self.stateTree.value}]
+            return move, "alphabeta", budget
+        return self.minimaxRoot(searchBoard), "minimax", None
+
+    def attachPatterns(self, searchBoard):
+        '''Gives searchBoard the pattern configurations the evaluation needs, if it uses patterns'''
+        if self.weights is not None:
+            from PatternEvaluation import PatternState
+            searchBoard.patterns = PatternState(searchBoard, self.weights)
+
+    def searchReport(self, move, mode, budget, seconds, tableBefore):
+        '''Returns the stats of one move: how it was chosen ("book", "endgame", "iterative",
+        "alphabeta" or "minimax", which is not counted), its value for Black, what that value
+        measures (valueType "evaluation" for the heuristic, or for endgame moves "discs", the final
+        disc difference, or "wld", 1/0/-1 for a win/draw/loss), the depth reached, nodes, nodes
+        per second, effective branching factor, cutoffs, each completed depth of iterative
+        deepening, and what the transposition table did during the search'''
+        nodes = None
+        cutoffs = None
+        value = self.stateTree.value
+        valueType = "evaluation"
+        if budget is not None:
+            nodes = budget.nodes
+            cutoffs = budget.cutoffs
+        elif mode == "endgame":
+            nodes = self.lastSolve["nodes"]
+            # The solver scores from the side to move's perspective
+            value = self.lastSolve["score"] if self.AIColor == 'B' else -self.lastSolve["score"]
+            valueType = "discs" if self.endgameMode == "exact" else "wld"
+        elif mode == "book":
+            nodes = 0
+
+        # Growth from one completed depth to the next, or the average over the plies of a single search
+        branching = None
+        counted = [entry for entry in self.depthStats if entry["nodes"]]
+        if len(counted) >= 2:
+            branching = counted[-1]["nodes"] / counted[-2]["nodes"]
+        elif nodes and self.lastDepth is not None:
+            branching = nodes ** (1 / (self.lastDepth + 1))
+
+        report = {"move": None if move is None else list(move), "color": self.AIColor, "mode": mode,
+                  "value": value, "valueType": valueType, "depth": self.lastDepth, "nodes": nodes, "seconds": seconds,
+                  "nps": nodes / seconds if nodes is not None and seconds > 0 else None,
+                  "branching": branching, "cutoffs": cutoffs, "depths": self.depthStats}
+
+        if tableBefore is not None:
+            tableAfter = self.transpositionTable.stats()
+            report["table"] = {key: tableAfter[key] - tableBefore[key] for key in ("hits", "misses", "stores", "overwrites")}
+            report["table"]["used"] = tableAfter["used"]
+        if self.lastPonder is not None:
+            report["ponder"] = self.lastPonder
+        return report
+
+    def improves(self, evaluation, best):
+        '''Returns True if evaluation is strictly better than best for the AI's color'''
+        if self.AIColor == "W":
+            return evaluation < best
+        return evaluation > best
+
+    def rootWindow(self, best, tie):
+        '''Returns the (alpha, beta) window a root move's value must fall in to beat best,
+        or also to tie it when tie is set. best is None before any move is searched'''
+        if best is None:
+            return float("-inf"), float("inf")
+        if self.AIColor == "W":
+            return float("-inf"), math.nextafter(best, float("inf")) if tie else best
+        return math.nextafter(best, float("-inf")) if tie else best, float("inf")
+
+    @staticmethod
+    def exactWithin(evaluation, alpha, beta):
+        '''Returns True if a value searched within (alpha, beta) is exact rather than a bound: it lies
+        inside the window, or on an infinite bound, which no true value can lie beyond'''
+        return ((alpha < evaluation or evaluation == alpha == float("-inf")) and
+                (evaluation < beta or evaluation == beta == float("inf")))
+
+    def minimaxRoot(self, searchBoard):
+        # Selecting the best element in the child eval list (the minimum for White)
+        best = None
+        move = None
+
+        # Populate children list with potential moves, unless an earlier search already did.
+        # Their values are not reused: they were searched fewer plies deep than lookAhead
+        if self.stateTree.children == {}:
+            self.stateTree.populateChildren(searchBoard, self.AIColor)
+
+        # Evaluate the value of each legal move and keep track of the best one
+        for child in self.stateTree.children.values():
+            index = Board.squareIndex(child.id[0], child.id[1])
+            record = searchBoard.applyMove(self.AIColor, index, searchBoard.determineFlips(self.AIColor, index))
+            evaluation = child.evaluateState(searchBoard, self.AIColor, self.lookAhead)
+            searchBoard.undoMove(record)
+            if move is None or self.improves(evaluation, best):
+                 best = evaluation
+                 move = child.id
+
+        self.stateTree.value = best
+        return move
+
+    def endgameRoot(self, searchBoard):
+        '''Solves the rest of the game exactly, keeping the solver's report in lastSolve'''
+        from Endgame import EndgameSolver
+        self.lastSolve = EndgameSolver(self.endgameMode).solve(searchBoard, self.AIColor)
+        self.lastDepth = 64 - searchBoard.score[0] - searchBoard.score[1]
+        return self.lastSolve["move"]
+
+    def iterativeDeepeningRoot(self, searchBoard, budget):
+        '''Searches one ply deeper at a time until the time or node budget runs out,
+        returning the move of the deepest search that finished'''
+        empties = 64 - searchBoard.score[0] - searchBoard.score[1]
+
+        # The shallowest search always completes so there is a move to fall back on
+        counter = SearchBudget() if self.stats else None
+        move = self.alphaBetaRoot(searchBoard, 0, counter)
+        self.lastDepth = 0
+        if counter is not None:
+            budget.nodes += counter.nodes
+            budget.cutoffs += counter.cutoffs
+            self.depthStats += [{"depth": 0, "nodes": counter.nodes, "seconds": counter.elapsed(),
+                                 "move": move, "value": self.stateTree.value}]
+
+        for depth in range(1, empties):
+            # An iteration costs several times the previous ones, so don't start one that can't finish
+            if self.timeBudget is not None and budget.elapsed() > self.timeBudget / 2:
+                break
+            nodes = budget.nodes
+            start = time.perf_counter()
+            try:
+                move = self.alphaBetaRoot(searchBoard.copy(), depth, budget)
+            except SearchTimeout:
+                break
+            self.lastDepth = depth
+            if self.stats:
+                self.depthStats += [{"depth": depth, "nodes": budget.nodes - nodes, "seconds": time.perf_counter() - start,
+                                     "move": move, "value": self.stateTree.value}]
+
+        return move
+
+    def alphaBetaRoot(self, searchBoard, lookAhead, budget=None, root=None):
+        '''Searches the root with alpha-beta, breaking ties towards the move minimax would pick.
+        root defaults to the current state tree; other roots (while pondering) are searched
+        in this process only'''
+        best = None
+        move = None
+
+        if root is None:
+            root = self.stateTree
+
+        if root.children == {}:
+            root.populateChildren(searchBoard, self.AIColor)
+
+        if root is self.stateTree and self.workers > 1 and len(root.children) > 1:
+            return self.parallelRoot(searchBoard, lookAhead, budget)
+
+        for child in root.orderChildren(searchBoard, self.AIColor, lookAhead + 1):
+            # Minimax keeps the first of several equal moves in board order, so a move that
+            # precedes the current best must also be searched for a tie
+            alpha, beta = self.rootWindow(best, move is not None and child.id < move)
+
+            index = Board.squareIndex(child.id[0], child.id[1])
+            record = searchBoard.applyMove(self.AIColor, index, searchBoard.determineFlips(self.AIColor, index))
+            evaluation = child.evaluateStateAlphaBeta(searchBoard, self.AIColor, lookAhead, 1, alpha, beta,
+                                                      self.transpositionTable, budget)
+            searchBoard.undoMove(record)
+
+            if move is None or self.improves(evaluation, best) or (evaluation == best and child.id < move):
+                best = evaluation
+                move = child.id
+
+        root.value = best
+        root.bestMove = move
+        return move
+
+    def parallelRoot(self, searchBoard, lookAhead, budget=None):
+        '''Searches the first ordered root move here, then every other one in the process pool
+        against its value, so the outcome does not depend on which worker finishes first'''
+        if self.pool is None:
+            tableBytes = 0
+            if self.transpositionTable is not None:
+                tableBytes = self.transpositionTable.buckets * 2 * TranspositionTable.ENTRY_BYTES
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(self.workers, initializer=initSearchWorker,
+                                            initargs=(tableBytes, self.evaluation, self.weightsPath))
+
+        children = self.stateTree.orderChildren(searchBoard, self.AIColor, lookAhead + 1)
+
+        # The eldest brother is searched with a full window to give the others a bound
+        first = children[0]
+        index = Board.squareIndex(first.id[0], first.id[1])
+        record = searchBoard.applyMove(self.AIColor, index, searchBoard.determineFlips(self.AIColor, index))
+        best = first.evaluateStateAlphaBeta(searchBoard, self.AIColor, lookAhead, 1, float("-inf"), float("inf"),
+                                            self.transpositionTable, budget)
+        searchBoard.undoMove(record)
+        move = first.id
+
+        deadline = None
+        nodes = None
+        if budget is not None:
+            # Workers get the deadline itself rather than the time left now, since a move
+            # may wait in the queue until another finishes (and perf_counter is per process)
+            if budget.deadline is not None:
+                deadline = time.time() + budget.deadline - time.perf_counter()
+            # The remaining nodes are shared out between the younger brothers, so the search as a
+            # whole stays within the node budget whatever the number of workers
+            if budget.maxNodes is not None:
+                nodes = max(0, budget.maxNodes - budget.nodes) // max(1, len(children) - 1)
+
+        # Younger brothers only need an exact value if they could beat or tie the eldest
+        futures = []
+        for child in children[1:]:
+            alpha, beta = self.rootWindow(best, child.id < first.id)
+            futures += [(child, alpha, beta, self.pool.submit(searchRootMove, searchBoard, self.AIColor, child.id,
+                                                              lookAhead, alpha, beta, deadline, nodes,
+                                                              budget is not None))]
+
+        timedOut = False
+        for child, alpha, beta, future in futures:
+            evaluation, visited, cutoffs = future.result()
+            if budget is not None:
+                budget.nodes += visited
+                budget.cutoffs += cutoffs
+            if evaluation is None:
+                timedOut = True
+                continue
+
+            child.value = evaluation
+            if AIPlayer.exactWithin(evaluation, alpha, beta) and (self.improves(evaluation, best) or
+                                                                  (evaluation == best and child.id < move)):
+                best = evaluation
+                move = child.id
+
+        if timedOut:
+            raise SearchTimeout()
+
+        self.stateTree.value = best
+        self.stateTree.bestMove = move
+        return move
+
+    def startPondering(self):
+        '''Starts searching the AI's answers to the opponent's likely replies in a background
+        thread, on a copy of the current board. The results go into the state tree and the
+        transposition table, so the reply actually played is answered from its subtree'''
+        self.stopPondering()
+        if self.searchMode != "alphabeta" or self.board.endState:
+            return
+
+        # Positions the endgame solver will take over gain nothing from a search
+        if 64 - self.board.score[0] - self.board.score[1] - 1 <= self.endgameEmpties:
+            return
+
+        # Every node a search visits can add one to the kept tree, so pondering stops after treeNodes of them
+        self.ponderBudget = SearchBudget(nodes=self.treeNodes)
+        self.ponderThread = threading.Thread(target=self.ponderSearch, args=(self.board.copy(), self.ponderBudget),
+                                             daemon=True)
+        self.ponderThread.start()
+
+    def stopPondering(self):
+        '''Stops the background search, if one is running, and waits for it to let go of the tree'''
+        if self.ponderThread is not None:
+            self.ponderBudget.stop()
+            self.ponderThread.join()
+            self.ponderThread = None
+            self.ponderBudget = None
+
+    def ponderSearch(self, searchBoard, budget):
+        '''Deepens the search below each reply of the opponent in turn, likeliest first, until
+        stopped, out of budget, or the depth the next move would be searched to is done for every
+        reply. The tree is then cut back down to treeNodes nodes'''
+        opponent = Board.getOppositeColor(self.AIColor)
+        self.attachPatterns(searchBoard)
+
+        # The root holds the opponent's replies, keeping any already explored by the last search
+        if self.stateTree.hash != searchBoard.hash ^ Board.sideKeys[opponent]:
+            self.stateTree.children = {}
+            self.stateTree.bestMove = None
+        if self.stateTree.children == {}:
+            self.stateTree.populateChildren(searchBoard, opponent)
+        replies = self.stateTree.orderChildren(searchBoard, opponent, 2)
+
+        # Under a budget, the next search is expected to get about one ply past the last one
+        if self.timeBudget is None and self.nodeBudget is None:
+            maxDepth = self.lookAhead
+        else:
+            maxDepth = min(64 - searchBoard.score[0] - searchBoard.score[1] - 1, (self.lastDepth or 0) + 1)
+
+        completed = -1
+        try:
+            for depth in range(maxDepth + 1):
+                for reply in replies:
+                    index = Board.squareIndex(reply.id[0], reply.id[1])
+                    record = searchBoard.applyMove(opponent, index, searchBoard.determineFlips(opponent, index))
+
+                    # Replies the AI must pass after, or answers from the book, need no search
+                    canMove = not searchBoard.mustPass and not searchBoard.endState
+                    if canMove and (self.openingBook is None or self.openingBook.lookup(searchBoard, self.AIColor) is None):
+                        self.alphaBetaRoot(searchBoard, depth, budget, reply)
+                    searchBoard.undoMove(record)
+                completed = depth
+        except SearchTimeout:
+            pass
+        self.pruneTree()
+
+        # completed is the deepest level searched below every reply
+        self.lastPonder = {"depth": completed, "replies": len(replies), "nodes": budget.nodes,
+                           "seconds": budget.elapsed(), "tree": self.treeStats["nodes"]}
+
+    def close(self):
+        '''Stops pondering, shuts down the search process pool, if one was started, and closes the opening book'''
+        self.stopPondering()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.openingBook is not None:
+            self.openingBook.close()
+            self.openingBook = None
+
+    def moveToNextLevel(self, color, moveID):
+        # Pondering may still be expanding the tree
+        self.stopPondering()
+
+        # Reuse the explored subtree if there is one, otherwise start a fresh one
+        if moveID in self.stateTree.children:
+            newRoot = self.stateTree.children[moveID]
+        else:
+            newRoot = StateNode(moveID)
+        self.stateTree = newRoot
+        self.pruneTree()
+
+    def pruneTree(self):
+        '''Cuts the retained search tree down to treeNodes nodes, keeping whole levels nearest
+        the root, which are the likeliest to be reused. Returns and stores the retained size'''
+        nodes = 0
+        size = 0
+        # Nodes already counted in or queued for the retained tree
+        kept = 1
+        level = [self.stateTree]
+        while level:
+            nextLevel = []
+            for node in level:
+                nodes += 1
+                size += sys.getsizeof(node) + sys.getsizeof(node.children)
+
+                # Nodes past the cap keep their value and best move but lose their subtree
+                if kept + len(node.children) > self.treeNodes:
+                    node.children = {}
+                else:
+                    kept += len(node.children)
+                    nextLevel += node.children.values()
+            level = nextLevel
+
+        self.treeStats = {"nodes": nodes, "bytes": size}
+        return self.treeStats
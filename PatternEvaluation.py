@@ -0,0 +1,296 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Table-driven pattern evaluation to replace the plain disc count of heuristicEvaluation1.
+
+NOTES:
+    * A pattern is an ordered list of squares (an edge, a 3x3 corner, a diagonal); each symmetric copy
+      of a pattern shares one weight table
+    * A pattern's configuration is a base 3 number of its squares (0 empty, 1 black, 2 white), and
+      PatternState keeps every configuration up to date as Board.applyMove/undoMove place and flip chips
+    * Evaluating a position is one table lookup per pattern, plus mobility and region parity terms
+    * Values are from the perspective of Black, like the rest of the engine
+    * Weights are kept in a compact file: a header, then each table as 16 bit integers
+    * Without a weights file, default tables are derived from a classic square value table, with
+      bonuses for edge chips anchored to a corner and no X-square penalty once the corner is taken
+
+Usage:
+    python PatternEvaluation.py weights.pat        write the default weights to a file
+'''
+
+
+import sys, struct
+from array import array
+from OthelloEngine import Board
+
+
+MAGIC = b"OTHPAT01"
+HEADER = struct.Struct("<8sI")
+LENGTH = struct.Struct("<I")
+SCALARS = struct.Struct("<hh")
+
+# Classic value of holding each square, row by row from [1,1]
+SQUARE_VALUES = [100, -20, 10, 5, 5, 10, -20, 100,
+                 -20, -50, -2, -2, -2, -2, -50, -20,
+                 10, -2, -1, -1, -1, -1, -2, 10,
+                 5, -2, -1, -1, -1, -1, -2, 5,
+                 5, -2, -1, -1, -1, -1, -2, 5,
+                 10, -2, -1, -1, -1, -1, -2, 10,
+                 -20, -50, -2, -2, -2, -2, -50, -20,
+                 100, -20, 10, 5, 5, 10, -20, 100]
+
+# Bonus for each edge chip that can no longer be captured because it is anchored to a corner
+STABLE_EDGE_BONUS = 15
+
+# Default weight of each extra legal move and of each region where the side to move has parity
+MOBILITY_WEIGHT = 8
+PARITY_WEIGHT = 4
+
+QUADRANTS = [0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000]
+
+
+def squares(*positions):
+    '''Returns bit indices for (row, column) positions counted from 0'''
+    return tuple(row * 8 + column for row, column in positions)
+
+
+# One representative of each pattern shape, squares listed from the corner outwards
+BASE_PATTERNS = [("edge", squares(*[(0, column) for column in range(8)])),
+                 ("corner", squares(*[(row, column) for row in range(3) for column in range(3)])),
+                 ("diagonal8", squares(*[(n, n) for n in range(8)])),
+                 ("diagonal7", squares(*[(n, n + 1) for n in range(7)])),
+                 ("diagonal6", squares(*[(n, n + 2) for n in range(6)])),
+                 ("diagonal5", squares(*[(n, n + 3) for n in range(5)])),
+                 ("diagonal4", squares(*[(n, n + 4) for n in range(4)]))]
+
+SYMMETRIES = [lambda row, column: (row, column),
+              lambda row, column: (column, row),
+              lambda row, column: (7 - row, column),
+              lambda row, column: (row, 7 - column),
+              lambda row, column: (7 - row, 7 - column),
+              lambda row, column: (7 - column, 7 - row),
+              lambda row, column: (column, 7 - row),
+              lambda row, column: (7 - column, row)]
+
+
+def expandPatterns():
+    '''Returns (pattern squares, table number) for every distinct symmetric copy of each base pattern'''
+    patterns = []
+    for table, (name, base) in enumerate(BASE_PATTERNS):
+        seen = set()
+        for symmetry in SYMMETRIES:
+            instance = tuple(row * 8 + column for row, column in
+                             (symmetry(index // 8, index % 8) for index in base))
+            if frozenset(instance) not in seen:
+                seen.add(frozenset(instance))
+                patterns += [(instance, table)]
+    return patterns
+
+
+PATTERNS = expandPatterns()
+
+# For each square, the (pattern number, power of 3) of every pattern it belongs to
+SQUARE_PATTERNS = [[] for index in range(64)]
+for number, (instance, table) in enumerate(PATTERNS):
+    for position, index in enumerate(instance):
+        SQUARE_PATTERNS[index] += [(number, 3 ** position)]
+
+# How many patterns each square appears in, so that default tables share its value between them
+COVERAGE = [len(entries) for entries in SQUARE_PATTERNS]
+
+
+class PatternWeights:
+    '''Weight tables for every base pattern, plus the mobility and parity weights'''
+
+    def __init__(self, tables, mobility, parity, path=None):
+        self.tables = tables
+        self.mobility = mobility
+        self.parity = parity
+        self.path = path
+
+    def save(self, path):
+        '''Writes the weights to a file that loadWeights() can read'''
+        with open(path, "wb") as output:
+            output.write(HEADER.pack(MAGIC, len(self.tables)))
+            for table in self.tables:
+                values = array("h", table)
+                if sys.byteorder != "little":
+                    values.byteswap()
+                output.write(LENGTH.pack(len(values)))
+                output.write(values.tobytes())
+            output.write(SCALARS.pack(self.mobility, self.parity))
+
+
+def configurationValue(base, configuration):
+    '''Returns the default value for Black of one configuration of a base pattern'''
+    name, squares = base
+    codes = []
+    for position in range(len(squares)):
+        codes += [configuration % 3]
+        configuration //= 3
+
+    value = 0
+    for position, index in enumerate(squares):
+        if codes[position] == 0:
+            continue
+        sign = 1 if codes[position] == 1 else -1
+        squareValue = SQUARE_VALUES[index]
+
+        # X-squares stop being a liability once their corner is occupied
+        if name == "corner" and position == 4 and codes[0] != 0:
+            squareValue = 0
+        value += sign * squareValue / COVERAGE[index]
+
+    # Edge chips running unbroken from an occupied corner can never be flipped
+    if name == "edge":
+        for run in (range(8), range(7, -1, -1)):
+            owner = codes[run[0]]
+            if owner == 0:
+                continue
+            for position in run:
+                if codes[position] != owner:
+                    break
+                value += STABLE_EDGE_BONUS if owner == 1 else -STABLE_EDGE_BONUS
+
+    return int(round(value))
+
+
+def defaultWeights():
+    '''Derives weight tables from SQUARE_VALUES and the bonuses above'''
+    tables = []
+    for base in BASE_PATTERNS:
+        tables += [[configurationValue(base, configuration) for configuration in range(3 ** len(base[1]))]]
+    return PatternWeights(tables, MOBILITY_WEIGHT, PARITY_WEIGHT)
+
+
+# Weights already loaded by this process, by path (None for the defaults)
+WEIGHT_CACHE = {}
+
+
+def loadWeights(path=None):
+    '''Returns the weights stored at path, or the default weights if path is None.
+    Each file is only read once per process. Raises ValueError if it is not a weights file'''
+    if path in WEIGHT_CACHE:
+        return WEIGHT_CACHE[path]
+
+    if path is None:
+        weights = defaultWeights()
+    else:
+        with open(path, "rb") as source:
+            data = source.read()
+        magic, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or count != len(BASE_PATTERNS):
+            raise ValueError("%s is not a pattern weights file" % path)
+
+        offset = HEADER.size
+        tables = []
+        for base in BASE_PATTERNS:
+            length, = LENGTH.unpack_from(data, offset)
+            offset += LENGTH.size
+            if length != 3 ** len(base[1]):
+                raise ValueError("%s has a %s table of the wrong size" % (path, base[0]))
+            values = array("h")
+            values.frombytes(data[offset:offset + 2 * length])
+            if sys.byteorder != "little":
+                values.byteswap()
+            offset += 2 * length
+            tables += [values]
+        mobility, parity = SCALARS.unpack_from(data, offset)
+        weights = PatternWeights(tables, mobility, parity, path)
+
+    WEIGHT_CACHE[path] = weights
+    return weights
+
+
+class PatternState:
+    '''Configuration of every pattern on a board, kept up to date by the board's moves'''
+
+    def __init__(self, board, weights):
+        self.weights = weights
+        self.indices = [0] * len(PATTERNS)
+        for color, code, bits in (('B', 1, board.black), ('W', 2, board.white)):
+            while bits:
+                bit = bits & -bits
+                bits ^= bit
+                for number, power in SQUARE_PATTERNS[bit.bit_length() - 1]:
+                    self.indices[number] += code * power
+
+    def __getstate__(self):
+        # Only the weights' path is sent to worker processes, which load their own copy
+        return (self.weights.path, self.indices)
+
+    def __setstate__(self, state):
+        path, self.indices = state
+        self.weights = loadWeights(path)
+
+    def copy(self):
+        '''Returns an independent copy sharing the same weights'''
+        state = PatternState.__new__(PatternState)
+        state.weights = self.weights
+        state.indices = self.indices[:]
+        return state
+
+    def place(self, color, index, flips, sign=1):
+        '''Updates configurations for a chip of color placed on index capturing flips.
+        A sign of -1 takes the move back instead'''
+        indices = self.indices
+        if color == 'B':
+            placed, flipped = sign, -sign
+        else:
+            placed, flipped = 2 * sign, sign
+
+        for number, power in SQUARE_PATTERNS[index]:
+            indices[number] += placed * power
+        while flips:
+            bit = flips & -flips
+            flips ^= bit
+            for number, power in SQUARE_PATTERNS[bit.bit_length() - 1]:
+                indices[number] += flipped * power
+
+    def evaluate(self, board, color):
+        '''Returns the value of board for Black, color being the side that just moved'''
+        tables = self.weights.tables
+        value = 0
+        for number, index in enumerate(self.indices):
+            value += tables[PATTERNS[number][1]][index]
+
+        # Having more moves than the opponent means fewer forced bad ones
+        mobility = board.mobility('B') - board.mobility('W')
+        value += self.weights.mobility * mobility
+
+        # Regions with an odd number of empties favour the side to move, who can play last in them
+        if board.mustPass:
+            toMove = color
+        else:
+            toMove = Board.getOppositeColor(color)
+        empty = ~(board.black | board.white) & Board.FULL
+        oddRegions = 0
+        for quadrant in QUADRANTS:
+            oddRegions += (empty & quadrant).bit_count() & 1
+        if toMove == 'B':
+            value += self.weights.parity * oddRegions
+        else:
+            value -= self.weights.parity * oddRegions
+
+        return value
+
+
+def main(arguments=None):
+    arguments = sys.argv[1:] if arguments is None else arguments
+    if len(arguments) != 1:
+        print("Usage: python PatternEvaluation.py <weights file>")
+        return 1
+    defaultWeights().save(arguments[0])
+    print("Wrote default weights to %s" % arguments[0])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
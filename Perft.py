@@ -0,0 +1,173 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Perft for the Othello engine: counts the leaf nodes of the game tree a fixed number of plies deep.
+Matching the known counts checks the move generator, and the leaves per second it reports are a
+repeatable throughput figure to compare before and after changing the board representation.
+
+NOTES:
+    * A pass counts as a ply, and a game that ends before the depth is reached counts as one leaf
+    * Passes and game ends are read from the mustPass/endState flags set by Board.determinePassEnd()
+    * --api walks the tree through determineCaptures()/modifyLayout() on board copies instead of bitboards
+
+Usage:
+    python Perft.py                            run the reference suite
+    python Perft.py --deep                     also run the slow reference counts
+    python Perft.py 8                          count from the initial position to depth 8
+    python Perft.py 5 "<64 squares>" W         count from a position with White to move
+'''
+
+
+import sys, time, argparse
+from OthelloEngine import Board
+
+
+# Known leaf counts by depth (starting at 1) for positions given as Board.fromString() squares and side to move
+REFERENCE_POSITIONS = [
+    ("initial", "---------------------------BW------WB---------------------------", 'B',
+     [4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288]),
+    ("midgame 1", "--W--------WW-----W-WW-----WWW----BBWW----BWB----BWBBBB-BW------", 'B',
+     [7, 86, 917, 11487, 133049]),
+    ("midgame 2", "--BWW-----BBWWW---BWWWWW--BWWW--BBBBWWW--B-BWWW---B--BB--------B", 'B',
+     [8, 114, 1053, 15055, 145526]),
+    ("midgame 3", "--WWWWW-WW-WBWBBBBWBWBWBBBWWBBWB--BBWBWBWWBBWWW-WW-WWWW---W-W-B-", 'B',
+     [9, 47, 409, 2072, 15967]),
+    ("late midgame", "--WWWW--BBBBWW-W-WWBBWWBW--WBWW-WWWWWWWWW--WBBWW---WWWBW---W-W--", 'B',
+     [13, 108, 1216, 9672, 95460]),
+    ("endgame with passes", "WW---W-WWWW-WWWWW-WWWWBBWBBBWWBWWBBBWWWWWBBBBWWWWBBBBBWWWWWWWWWW", 'B',
+     [6, 18, 67, 151, 267, 268, 269, 269]),
+]
+
+# Counts above this many leaves are only checked with --deep
+QUICK_LIMIT = 500000
+
+
+def perft(board, color, depth):
+    '''Returns the number of leaves depth plies below board with color to move.
+    The board's pass flags must describe color, as they do after the other color moves'''
+    if depth == 0 or board.endState:
+        return 1
+
+    opponent = Board.getOppositeColor(color)
+
+    # Passing leaves the board alone, and the opponent is then certain to have a move
+    if board.mustPass:
+        board.mustPass = False
+        leaves = perft(board, opponent, depth - 1)
+        board.mustPass = True
+        return leaves
+
+    moves = board.legalMoves(color)
+
+    # Every legal move is a leaf at the last ply, so there is no need to play them
+    if depth == 1:
+        return moves.bit_count()
+
+    leaves = 0
+    while moves:
+        move = moves & -moves
+        moves ^= move
+        index = move.bit_length() - 1
+        record = board.applyMove(color, index, board.determineFlips(color, index))
+        leaves += perft(board, opponent, depth - 1)
+        board.undoMove(record)
+    return leaves
+
+
+def perftApi(board, color, depth):
+    '''Same count as perft(), found through the (row, column) API on a copy of the board per move'''
+    if depth == 0 or board.endState:
+        return 1
+
+    opponent = Board.getOppositeColor(color)
+
+    if board.mustPass:
+        nextBoard = board.copy()
+        nextBoard.mustPass = False
+        return perftApi(nextBoard, opponent, depth - 1)
+
+    leaves = 0
+    for row in range(1, 9):
+        for column in range(1, 9):
+            captures = board.determineCaptures(color, row, column)
+            if captures != []:
+                nextBoard = board.copy()
+                nextBoard.modifyLayout(color, row, column, captures, redraw=False)
+                leaves += perftApi(nextBoard, opponent, depth - 1)
+    return leaves
+
+
+def timePerft(board, color, depth, api=False):
+    '''Returns (leaves, seconds) for a perft of board with color to move'''
+    start = time.perf_counter()
+    if api:
+        leaves = perftApi(board, color, depth)
+    else:
+        leaves = perft(board, color, depth)
+    return leaves, time.perf_counter() - start
+
+
+def report(name, depth, leaves, seconds, expected=None):
+    '''Prints one perft result line, marking it against the expected count if one is known'''
+    rate = leaves / seconds if seconds > 0 else float("inf")
+    if depth is None:
+        depthText = "all depths"
+    else:
+        depthText = "depth %2d" % depth
+    line = "%-20s %10s: %12d leaves in %8.3fs (%10.0f leaves/s)" % (name, depthText, leaves, seconds, rate)
+    if expected is not None:
+        line += "  ok" if leaves == expected else "  MISMATCH, expected %d" % expected
+    print(line)
+
+
+def runSuite(deep=False, api=False):
+    '''Runs every reference position to each depth with a known count.
+    Returns True if all counts matched'''
+    allMatched = True
+    totalLeaves = 0
+    totalSeconds = 0
+    for name, squares, color, counts in REFERENCE_POSITIONS:
+        for depth, expected in enumerate(counts, 1):
+            if expected > QUICK_LIMIT and not deep:
+                continue
+            leaves, seconds = timePerft(Board.fromString(squares, color), color, depth, api)
+            report(name, depth, leaves, seconds, expected)
+            allMatched = allMatched and leaves == expected
+            totalLeaves += leaves
+            totalSeconds += seconds
+
+    report("total", None, totalLeaves, totalSeconds)
+    print("All counts matched" if allMatched else "Some counts did NOT match")
+    return allMatched
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Count game tree leaves to check and time the move generator")
+    parser.add_argument("depth", type=int, nargs="?", help="count a single position to this depth")
+    parser.add_argument("squares", nargs="?", help="64 squares of 'B', 'W' or '-' (default: initial position)")
+    parser.add_argument("color", nargs="?", default='B', help="side to move, B or W (default: B)")
+    parser.add_argument("--deep", action="store_true", help="include slow reference counts in the suite")
+    parser.add_argument("--api", action="store_true", help="use determineCaptures()/modifyLayout() instead of bitboards")
+    options = parser.parse_args(arguments)
+
+    if options.depth is None:
+        return 0 if runSuite(options.deep, options.api) else 1
+
+    if options.squares is None:
+        board = Board()
+    else:
+        board = Board.fromString(options.squares, options.color)
+    leaves, seconds = timePerft(board, options.color, options.depth, options.api)
+    report("position", options.depth, leaves, seconds)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
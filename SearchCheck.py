@@ -0,0 +1,184 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Search equivalence check: every search mode of AIPlayer must pick the same move with the same
+value as plain minimax. Positions are searched by minimax, by alpha-beta with and without the
+transposition table, and by alpha-beta sharing its root moves out to a process pool.
+The same searches are then made through whole games by players that keep their trees between moves.
+
+NOTES:
+    * Positions come from a fixed list and from random games stopped at several numbers of empties,
+      so that forced wins and losses (values of +inf and -inf) and exact ties are both covered
+    * Each position is searched for the side to move, from a fresh state tree, to every depth up to --depth
+    * In the games White is played by minimax and Black at random; every player, minimax included,
+      follows the game with moveToNextLevel() and searches each White position from the tree it kept
+    * The endgame solver and the opening book are turned off, so only the heuristic searches are compared
+
+Usage:
+    python SearchCheck.py                      run the check
+    python SearchCheck.py --depth 4 --positions 40 --games 10 --evaluation patterns
+'''
+
+
+import sys, random, argparse
+from OthelloEngine import Board, AIPlayer, StateNode
+
+
+# Positions as Board.fromString() squares and side to move, some of them lost or won whatever is played
+FIXED_POSITIONS = [
+    ("WWWWWWWWWWWWBWWWWWBBWBWWWWBWWWWWWWBWBBWWWWWBBWBWWWBBBB-WWBBBBB--", 'W'),
+    ("WWWWWWWWWWWWBWWWWWBBWBWWWWBWWWWWWWBWBBWWWWWBBWBWWWBBBB-WWBBBBB--", 'B'),
+    ("WW---W-WWWW-WWWWW-WWWWBBWBBBWWBWWBBBWWWWWBBBBWWWWBBBBBWWWWWWWWWW", 'B'),
+    ("--WWWWW-WW-WBWBBBBWBWBWBBBWWBBWB--BBWBWBWWBBWWW-WW-WWWW---W-W-B-", 'B'),
+    ("--WWWW--BBBBWW-W-WWBBWWBW--WBWW-WWWWWWWWW--WBBWW---WWWBW---W-W--", 'B'),
+    ("--W--------WW-----W-WW-----WWW----BBWW----BWB----BWBBBB-BW------", 'B'),
+]
+
+# Empties at which the random games are stopped
+RANDOM_EMPTIES = (4, 6, 9, 14, 24, 40)
+
+# Searches compared against minimax, as AIPlayer arguments
+CONFIGURATIONS = [
+    ("alphabeta", {"searchMode": "alphabeta", "tableBytes": 0}),
+    ("alphabeta+table", {"searchMode": "alphabeta"}),
+    ("parallel", {"searchMode": "alphabeta", "workers": 2}),
+]
+
+
+def randomPosition(empties, seed):
+    '''Plays a random game until at most empties squares are left.
+    Returns (squares, side to move), or None if the game ended first'''
+    generator = random.Random(seed)
+    board = Board()
+    color = 'B'
+    while 64 - board.score[0] - board.score[1] > empties:
+        if board.endState:
+            return None
+        if board.mustPass:
+            board.mustPass = False
+        else:
+            move = generator.choice(Board.bitPositions(board.legalMoves(color)))
+            board.modifyLayout(color, move[0], move[1], redraw=False)
+        color = Board.getOppositeColor(color)
+    if board.endState:
+        return None
+    if board.mustPass:
+        color = Board.getOppositeColor(color)
+    return board.toString(), color
+
+
+def searchPosition(ai, squares, color, depth):
+    '''Returns (move, value) of ai searching the position from a fresh state tree'''
+    board = Board.fromString(squares, color)
+    ai.board = board
+    ai.AIColor = color
+    ai.lookAhead = depth
+    ai.stateTree = StateNode((0, 0))
+    move = ai.chooseMove(board.copy())
+    return move, ai.stateTree.value
+
+
+def checkPositions(positions, depth, evaluation):
+    '''Searches every position to each depth up to depth with every configuration.
+    Returns the number of searches that disagreed with minimax'''
+    arguments = {"endgameEmpties": 0, "evaluation": evaluation}
+    reference = AIPlayer(Board(), searchMode="minimax", **arguments)
+    players = [(name, AIPlayer(Board(), **dict(arguments, **configuration))) for name, configuration in CONFIGURATIONS]
+
+    mismatches = 0
+    searches = 0
+    try:
+        for squares, color in positions:
+            for lookAhead in range(1, depth + 1):
+                expected = searchPosition(reference, squares, color, lookAhead)
+                for name, ai in players:
+                    found = searchPosition(ai, squares, color, lookAhead)
+                    searches += 1
+                    if found != expected:
+                        mismatches += 1
+                        print("MISMATCH %-16s depth %d: %s %s played %s, minimax %s"
+                              % (name, lookAhead, squares, color, found, expected))
+    finally:
+        for name, ai in players:
+            ai.close()
+
+    print("%d positions, %d searches compared with minimax" % (len(positions), searches))
+    return mismatches
+
+
+def checkGames(games, depth, evaluation, seed):
+    '''Plays games in which players keeping their trees between moves search every White position.
+    Returns the number of searches that disagreed with a fresh minimax search'''
+    arguments = {"lookAhead": depth, "endgameEmpties": 0, "evaluation": evaluation}
+    reference = AIPlayer(Board(), searchMode="minimax", **arguments)
+    configurations = [("minimax", {"searchMode": "minimax"})] + CONFIGURATIONS
+
+    mismatches = 0
+    searches = 0
+    for game in range(games):
+        generator = random.Random(seed * 1000003 + game)
+        board = Board()
+        players = [(name, AIPlayer(board, **dict(arguments, **configuration))) for name, configuration in configurations]
+        color = 'B'
+        try:
+            while not board.endState:
+                if board.mustPass:
+                    board.mustPass = False
+                    color = Board.getOppositeColor(color)
+                    continue
+                if color == 'B':
+                    move = tuple(generator.choice(Board.bitPositions(board.legalMoves(color))))
+                else:
+                    expected = searchPosition(reference, board.toString(), color, depth)
+                    for name, ai in players:
+                        found = ai.chooseMove(board.copy()), ai.stateTree.value
+                        searches += 1
+                        if found != expected:
+                            mismatches += 1
+                            print("MISMATCH %-16s game %d: %s %s played %s, minimax %s"
+                                  % (name, game, board.toString(), color, found, expected))
+                    move = expected[0]
+
+                board.modifyLayout(color, move[0], move[1], redraw=False)
+                for name, ai in players:
+                    ai.moveToNextLevel(color, move)
+                color = Board.getOppositeColor(color)
+        finally:
+            for name, ai in players:
+                ai.close()
+
+    print("%d games, %d searches from kept trees compared with minimax" % (games, searches))
+    return mismatches
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Check that every search mode picks the move minimax picks")
+    parser.add_argument("--depth", type=int, default=3, help="deepest search compared")
+    parser.add_argument("--positions", type=int, default=8, help="random games stopped at each number of empties")
+    parser.add_argument("--games", type=int, default=3, help="games played with trees kept between moves")
+    parser.add_argument("--evaluation", choices=("patterns", "discs"), default="discs", help="evaluation function")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the random games")
+    options = parser.parse_args(arguments)
+
+    positions = list(FIXED_POSITIONS)
+    for empties in RANDOM_EMPTIES:
+        for game in range(options.positions):
+            position = randomPosition(empties, options.seed * 1000003 + empties * 1009 + game)
+            if position is not None:
+                positions += [position]
+
+    mismatches = checkPositions(positions, options.depth, options.evaluation)
+    mismatches += checkGames(options.games, options.depth, options.evaluation, options.seed)
+    print("All searches agreed" if not mismatches else "%d searches did NOT agree" % mismatches)
+    return 0 if not mismatches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
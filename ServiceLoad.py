@@ -0,0 +1,163 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Load generator for GameService: plays many games at once against a running service and reports
+move latency and how many sessions fit in a GB of the service's memory.
+
+NOTES:
+    * Each client is one keep-alive connection playing random legal moves, game after game
+    * A move's latency runs from sending the human's move until the AI's answer has arrived
+    * Sessions per GB is measured by opening idle games and reading the service's /stats before and after
+    * Start the service first, e.g. python GameService.py --port 8765
+
+Usage:
+    python ServiceLoad.py --clients 200 --games 2 --idle-sessions 10000
+'''
+
+
+import sys, time, json, random, asyncio, argparse
+
+
+class ServiceClient:
+    '''One keep-alive HTTP connection to the service'''
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @staticmethod
+    async def connect(host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return ServiceClient(reader, writer)
+
+    async def request(self, method, path, payload=None):
+        '''Returns (status, decoded JSON body) of one request'''
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.writer.write(b"%s %s HTTP/1.1\r\nHost: service\r\nContent-Length: %d\r\n\r\n"
+                          % (method.encode(), path.encode(), len(body)) + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, separator, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        self.writer.close()
+
+
+def percentile(values, fraction):
+    '''Returns the value below which fraction of the sorted values lie'''
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+async def playGames(host, port, games, maxMoves, generator, latencies):
+    '''Plays games one after another on a single connection, adding each move's latency to latencies.
+    Returns the number of errors the service answered with'''
+    client = await ServiceClient.connect(host, port)
+    errors = 0
+    try:
+        for game in range(games):
+            status, state = await client.request("POST", "/games")
+            played = 0
+            while not state["over"] and played < maxMoves:
+                row, column = generator.choice(state["moves"])
+                start = time.perf_counter()
+                status, reply = await client.request("POST", "/games/%s/move" % state["id"],
+                                                     {"row": row, "column": column})
+                latencies += [time.perf_counter() - start]
+                if status != 200:
+                    errors += 1
+                    break
+                state = reply
+                played += 1
+            await client.request("DELETE", "/games/%s" % state["id"])
+    finally:
+        client.close()
+    return errors
+
+
+async def measureSessions(host, port, sessions, connections=20):
+    '''Opens sessions idle games and returns (sessions, bytes the service grew by), then ends them'''
+    clients = [await ServiceClient.connect(host, port) for connection in range(connections)]
+    status, before = await clients[0].request("GET", "/stats")
+
+    async def openGames(client, count):
+        ids = []
+        for game in range(count):
+            status, state = await client.request("POST", "/games")
+            ids += [state["id"]]
+        return ids
+
+    shares = [sessions // connections + (n < sessions % connections) for n in range(connections)]
+    idLists = await asyncio.gather(*[openGames(client, count) for client, count in zip(clients, shares)])
+    status, after = await clients[0].request("GET", "/stats")
+
+    async def endGames(client, ids):
+        for id in ids:
+            await client.request("DELETE", "/games/%s" % id)
+
+    await asyncio.gather(*[endGames(client, ids) for client, ids in zip(clients, idLists)])
+    for client in clients:
+        client.close()
+    return after["sessions"] - before["sessions"], after["rssBytes"] - before["rssBytes"]
+
+
+async def run(options):
+    if options.idle_sessions:
+        sessions, grown = await measureSessions(options.host, options.port, options.idle_sessions)
+        perSession = max(grown, 1) / sessions
+        print("%d idle sessions grew the service by %.1f MB: %.0f bytes each, %.0f sessions per GB"
+              % (sessions, grown / 2 ** 20, perSession, 2 ** 30 / perSession))
+
+    latencies = []
+    start = time.perf_counter()
+    errors = await asyncio.gather(*[playGames(options.host, options.port, options.games, options.max_moves,
+                                              random.Random(options.seed + client), latencies)
+                                    for client in range(options.clients)])
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    print("%d clients played %d moves in %.1fs (%.1f moves/s), %d errors"
+          % (options.clients, len(latencies), seconds, len(latencies) / seconds, sum(errors)))
+    print("move latency: p50 %.1f ms, p99 %.1f ms, max %.1f ms"
+          % (1000 * percentile(latencies, 0.5), 1000 * percentile(latencies, 0.99), 1000 * percentile(latencies, 1)))
+
+    client = await ServiceClient.connect(options.host, options.port)
+    status, stats = await client.request("GET", "/stats")
+    client.close()
+    if stats["aiMoves"]:
+        print("AI: %d moves, %.1f ms search each on average" % (stats["aiMoves"], 1000 * stats["aiSeconds"] / stats["aiMoves"]))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Play many games against a running GameService")
+    parser.add_argument("--host", default="127.0.0.1", help="service address")
+    parser.add_argument("--port", type=int, default=8765, help="service port")
+    parser.add_argument("--clients", type=int, default=100, help="concurrent connections playing games")
+    parser.add_argument("--games", type=int, default=1, help="games each client plays")
+    parser.add_argument("--max-moves", type=int, default=60, help="human moves after which a game is abandoned")
+    parser.add_argument("--idle-sessions", type=int, default=10000, help="idle games opened to measure memory (0 skips)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the clients' random moves")
+    options = parser.parse_args(arguments)
+    asyncio.run(run(options))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+###############################################
+## Vignesh Selvaraj                          ##
+## Luis Sosa                                 ##
+## Nicholas Wagner                           ##
+###############################################
+## Artificial Inteligence Project 1: Othello ##
+###############################################
+
+
+'''
+Self-play tournament: plays AIPlayer configurations against each other in a process pool and
+reports what each costs (time per move, games per second) and how strong it is (score, Elo).
+
+NOTES:
+    * A configuration is written name:argument=value,... with AIPlayer's keyword arguments,
+      e.g. d2:lookAhead=2 or discs3:lookAhead=3,evaluation=discs
+    * player=mcts makes it a MonteCarloPlayer with that class's arguments instead,
+      e.g. uct:player=mcts,timeBudget=0.5
+    * After every move both players are told about it (moveToNextLevel), so they can keep their trees
+    * Every pair of configurations plays --games games, in pairs from the same random opening
+      with colors swapped, so neither side profits from a lucky opening
+    * Elo differences come from the score fraction, with 95% confidence intervals from its Wilson score
+      interval, which stays honest for a handful of games or a perfect score
+    * Game records are one line per game: black, white, final chips, then the moves as
+      squares (a1 to h8, column then row) with -- for a pass
+    * --archive also appends every game to a game archive (see GameArchive) for position queries
+
+Usage:
+    python Tournament.py d1:lookAhead=1 d2:lookAhead=2 --games 20 --workers 4 --records games.txt
+'''
+
+
+import sys, math, time, random, argparse
+from concurrent.futures import ProcessPoolExecutor
+from OthelloEngine import Board, AIPlayer
+
+
+# Arguments every tournament AIPlayer gets unless its configuration says otherwise
+DEFAULT_ARGUMENTS = {"tableBytes": 4 * 2 ** 20, "endgameEmpties": 8}
+
+# z value of a two-sided 95% confidence interval
+Z95 = 1.96
+
+
+def parseConfiguration(text):
+    '''Returns (name, AIPlayer keyword arguments) for a name:argument=value,... configuration'''
+    name, separator, settings = text.partition(":")
+    arguments = {}
+    for setting in settings.split(","):
+        if not setting:
+            continue
+        key, separator, value = setting.partition("=")
+        if not separator:
+            raise ValueError("Expected argument=value in configuration %r" % text)
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                pass
+        if value == "None":
+            value = None
+        elif value in ("True", "False"):
+            value = value == "True"
+        arguments[key] = value
+    if arguments.get("player", "minimax") not in ("minimax", "mcts"):
+        raise ValueError("Unknown player %r in configuration %r" % (arguments["player"], text))
+    if arguments.get("player") != "mcts":
+        arguments = dict(DEFAULT_ARGUMENTS, **arguments)
+    return name, arguments
+
+
+def createPlayer(board, color, arguments):
+    '''Returns the AIPlayer, or with player=mcts the MonteCarloPlayer, a configuration describes'''
+    arguments = dict(arguments)
+    if arguments.pop("player", "minimax") == "mcts":
+        from MonteCarlo import MonteCarloPlayer
+        return MonteCarloPlayer(board, color=color, **arguments)
+    return AIPlayer(board, color=color, **arguments)
+
+
+def squareName(move):
+    '''Returns the record name of a (row, column) move, or -- for a pass'''
+    if move is None:
+        return "--"
+    return "abcdefgh"[move[1] - 1] + str(move[0])
+
+
+def randomOpening(plies, seed):
+    '''Returns plies random legal moves from the initial position, as (row, column) or None for passes'''
+    generator = random.Random(seed)
+    board = Board()
+    color = 'B'
+    moves = []
+    for ply in range(plies):
+        if board.endState:
+            break
+        if board.mustPass:
+            board.mustPass = False
+            moves += [None]
+        else:
+            move = generator.choice(Board.bitPositions(board.legalMoves(color)))
+            board.modifyLayout(color, move[0], move[1], redraw=False)
+            moves += [tuple(move)]
+        color = Board.getOppositeColor(color)
+    return moves
+
+
+def playGame(task):
+    '''Worker task: plays one game between two configurations from an opening.
+    Returns the game's result, its moves and the time each side spent choosing'''
+    blackName, blackArguments, whiteName, whiteArguments, opening = task
+    board = Board()
+    players = {'B': createPlayer(board, 'B', blackArguments), 'W': createPlayer(board, 'W', whiteArguments)}
+    seconds = {'B': 0, 'W': 0}
+    searched = {'B': 0, 'W': 0}
+    moves = []
+    color = 'B'
+
+    while not board.endState:
+        if board.mustPass:
+            board.mustPass = False
+            move = None
+        elif len(moves) < len(opening):
+            move = opening[len(moves)]
+        else:
+            start = time.perf_counter()
+            move = players[color].chooseMove(board.copy())
+            seconds[color] += time.perf_counter() - start
+            searched[color] += 1
+        if move is not None:
+            board.modifyLayout(color, move[0], move[1], redraw=False)
+            for player in players.values():
+                player.moveToNextLevel(color, move)
+        moves += [move]
+        color = Board.getOppositeColor(color)
+
+    for player in players.values():
+        player.close()
+    return {"black": blackName, "white": whiteName, "score": board.score[:], "moves": moves,
+            "seconds": seconds, "searched": searched}
+
+
+def recordLine(game):
+    '''Returns the compact record of a finished game'''
+    return "%s %s %d-%d %s" % (game["black"], game["white"], game["score"][0], game["score"][1],
+                               "".join(squareName(move) for move in game["moves"]))
+
+
+def eloDifference(fraction):
+    '''Returns the Elo difference that an expected score fraction corresponds to'''
+    if fraction <= 0:
+        return float("-inf")
+    if fraction >= 1:
+        return float("inf")
+    return -400 * math.log10(1 / fraction - 1)
+
+
+def scoreSummary(points):
+    '''Returns (score fraction, Elo, Elo low, Elo high) from a list of per game points (1, 0.5 or 0)'''
+    games = len(points)
+    fraction = sum(points) / games
+
+    # Wilson score interval: unlike the standard error, it stays wide for few games or a one-sided score
+    spread = Z95 ** 2 / games
+    center = (fraction + spread / 2) / (1 + spread)
+    error = Z95 / (1 + spread) * math.sqrt(fraction * (1 - fraction) / games + spread / (4 * games))
+    return (fraction, eloDifference(fraction), eloDifference(max(0, center - error)),
+            eloDifference(min(1, center + error)))
+
+
+def runTournament(configurations, games=20, openingPlies=4, workers=None, seed=1, recordsPath=None,
+                  archivePath=None):
+    '''Plays every pair of configurations against each other and prints the results.
+    Returns the list of games played'''
+    tasks = []
+    for first in range(len(configurations)):
+        for second in range(first + 1, len(configurations)):
+            (nameA, argumentsA), (nameB, argumentsB) = configurations[first], configurations[second]
+            for game in range(0, games, 2):
+                opening = randomOpening(openingPlies, seed * 1000003 + len(tasks))
+                tasks += [(nameA, argumentsA, nameB, argumentsB, opening)]
+                if game + 1 < games:
+                    tasks += [(nameB, argumentsB, nameA, argumentsA, opening)]
+
+    start = time.perf_counter()
+    results = []
+    records = None if recordsPath is None else open(recordsPath, "w")
+    archive = None
+    if archivePath is not None:
+        from GameArchive import GameArchiveWriter
+        archive = GameArchiveWriter(archivePath)
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            for game in pool.map(playGame, tasks):
+                results += [game]
+                if records is not None:
+                    records.write(recordLine(game) + "\n")
+                if archive is not None:
+                    archive.writeGame(game["moves"])
+    finally:
+        if records is not None:
+            records.close()
+        if archive is not None:
+            archive.close()
+    elapsed = time.perf_counter() - start
+
+    report(configurations, results, elapsed)
+    return results
+
+
+def report(configurations, results, elapsed):
+    '''Prints throughput, cost per move, and strength per configuration and per pairing'''
+    totalMoves = sum(len(game["moves"]) for game in results)
+    print("%d games, %d moves in %.1fs: %.2f games/s" % (len(results), totalMoves, elapsed, len(results) / elapsed))
+
+    print("\n%-12s %6s %10s %8s %8s %22s" % ("config", "games", "ms/move", "score", "Elo", "95% interval"))
+    points = {name: [] for name, arguments in configurations}
+    seconds = {name: 0 for name, arguments in configurations}
+    searched = {name: 0 for name, arguments in configurations}
+    pairings = {}
+    for game in results:
+        black, white = game["black"], game["white"]
+        blackPoints = 1 if game["score"][0] > game["score"][1] else 0.5 if game["score"][0] == game["score"][1] else 0
+        points[black] += [blackPoints]
+        points[white] += [1 - blackPoints]
+        seconds[black] += game["seconds"]['B']
+        seconds[white] += game["seconds"]['W']
+        searched[black] += game["searched"]['B']
+        searched[white] += game["searched"]['W']
+        pairings.setdefault((black, white), []).append(blackPoints)
+        pairings.setdefault((white, black), []).append(1 - blackPoints)
+
+    # Against the field, each configuration's Elo is relative to the average of its opponents
+    for name, arguments in configurations:
+        if not points[name]:
+            continue
+        fraction, elo, low, high = scoreSummary(points[name])
+        perMove = 1000 * seconds[name] / max(1, searched[name])
+        print("%-12s %6d %10.1f %7.1f%% %+8.0f %+10.0f to %+.0f" % (name, len(points[name]), perMove, 100 * fraction,
+                                                               elo, low, high))
+
+    print("\n%-25s %6s %8s %8s %22s" % ("pairing", "games", "score", "Elo", "95% interval"))
+    for first in range(len(configurations)):
+        for second in range(first + 1, len(configurations)):
+            nameA, nameB = configurations[first][0], configurations[second][0]
+            fraction, elo, low, high = scoreSummary(pairings[(nameA, nameB)])
+            print("%-25s %6d %7.1f%% %+8.0f %+10.0f to %+.0f" % (nameA + " vs " + nameB, len(pairings[(nameA, nameB)]),
+                                                               100 * fraction, elo, low, high))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Play AIPlayer configurations against each other")
+    parser.add_argument("configurations", nargs="+", help="name:argument=value,... for each AIPlayer (at least two)")
+    parser.add_argument("--games", type=int, default=20, help="games per pair of configurations")
+    parser.add_argument("--opening-plies", type=int, default=4, help="random plies played before the AIs take over")
+    parser.add_argument("--workers", type=int, default=None, help="game processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the random openings")
+    parser.add_argument("--records", help="file to write the game records to")
+    parser.add_argument("--archive", help="game archive file to append the games to")
+    options = parser.parse_args(arguments)
+
+    configurations = [parseConfiguration(text) for text in options.configurations]
+    if len(configurations) < 2 or len(set(name for name, settings in configurations)) != len(configurations):
+        parser.error("need at least two configurations with different names")
+    runTournament(configurations, options.games, options.opening_plies, options.workers, options.seed, options.records,
+                  options.archive)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())